@@ -3,6 +3,8 @@ import os
 from typing import List, Dict, Any
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), 'config.json')
+ARRIVAL_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'arrivals_cache.json')
+GTFS_CACHE_FILE = os.path.join(os.path.dirname(__file__), 'gtfs_cache.pickle')
 
 
 def _load_config() -> Dict[str, Any]:
@@ -43,3 +45,35 @@ def save_scripts(scripts: List[Dict[str, Any]]) -> None:
     config = _load_config()
     config['scripts'] = scripts
     _save_config(config)
+
+
+def load_polling_config() -> Dict[str, Any]:
+    """Load feed polling policy overrides (see transit.worker.PollPolicy)"""
+    config = _load_config()
+    return config.get('polling', {})
+
+
+def load_bus_api_key() -> str:
+    """Load the MTA Bus Time API key (MTA_BUS_API_KEY overrides the config file)"""
+    config = _load_config()
+    return os.environ.get('MTA_BUS_API_KEY') or config.get('bus_api_key', '')
+
+
+def load_gtfs_sources() -> Dict[str, List[str]]:
+    """Load the static GTFS zips (URLs or local paths) the import API may fetch: feed -> sources"""
+    config = _load_config()
+    sources = config.get('gtfs_sources', {})
+    return {feed: [value] if isinstance(value, str) else list(value) for feed, value in sources.items()}
+
+
+def load_stop_filters() -> Dict[str, Dict[str, List[str]]]:
+    """Load per-stop arrival filters: stop_id -> {'routes': [...], 'directions': [...], 'destinations': [...]}"""
+    config = _load_config()
+    return config.get('stop_filters', {})
+
+
+def save_stop_filters(filters: Dict[str, Dict[str, List[str]]]) -> None:
+    """Save per-stop arrival filters to config file"""
+    config = _load_config()
+    config['stop_filters'] = filters
+    _save_config(config)
@@ -67,7 +67,6 @@ class StopData:
     def start(self, api_key, stops):
         self.worker = MTAWorker(
             configured_stop_ids=[self.stop_id],
-            refresh_s=30.0,
             api_key=api_key,
             buffers=self.buffers,
             name=self.name,
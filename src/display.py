@@ -11,54 +11,39 @@ import subprocess
 import sys
 import threading
 import time
-from typing import Dict, Optional, List, Callable
+from typing import Dict, Optional, List, Callable, Tuple
 
 from core.matrix import load_matrix, import_matrix
+from transit.gtfs_static import DEFAULT_ROUTE_STYLE, Route, route_styles
 from transit.worker import DataBuffers
 
 # Import graphics for drawing
 _, _, graphics = import_matrix()
 
 # Colors
-DARK_RED = graphics.Color(110, 0, 0)
 GRAY = graphics.Color(90, 90, 90)
 BLACK = graphics.Color(0, 0, 0)
 WHITE = graphics.Color(95, 95, 95)
+DIM_WHITE = graphics.Color(35, 35, 35)
 GREEN = graphics.Color(0, 110, 0)
-BLUE = graphics.Color(0, 10, 155)
-DARK_GREEN = graphics.Color(6, 64, 43)
-PURPLE = graphics.Color(200, 0, 200)
-DARK_PURPLE = graphics.Color(200, 100, 200)
-ORANGE = graphics.Color(255, 140, 0)
-YELLOW = graphics.Color(155, 155, 0)
-BROWN = graphics.Color(59, 29, 12)
 
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), "../assets")
 
+# Redraw just after a countdown boundary rather than exactly on it
+MINUTE_TICK_SLACK = 0.05
+# How often a shown stop checks whether a feed refresh has landed
+BUFFER_CHECK_S = 0.5
 
-def get_route_color(route: str):
-    """Get color for a subway route"""
-    if route in ("A", "C", "E"):
-        return BLUE
-    if route in ("1", "2", "3"):
-        return DARK_RED
-    if route == "7X":
-        return DARK_PURPLE
-    if route == "7":
-        return PURPLE
-    if route in ("B", "D", "F", "M"):
-        return ORANGE
-    if route in ("N", "Q", "R", "W"):
-        return YELLOW
-    if route in ("J", "Z"):
-        return BROWN
-    if route in ("4", "5", "6"):
-        return DARK_GREEN
-    if route == "L":
-        return GRAY
-    if route == "G":
-        return GREEN
-    return GRAY
+
+def build_route_colors(routes: Dict[str, Route]) -> Dict[str, Tuple]:
+    """route -> (bullet Color, label Color, label) from routes.txt, adjusted for the LEDs"""
+    colors = {}
+    for route_id, style in route_styles(routes).items():
+        # Always the full short name: longer (bus) names get a wider bullet rather than being cut
+        # down to another route's name (Q10 -> "Q1")
+        label = style.label or route_id
+        colors[route_id] = (graphics.Color(*style.color), graphics.Color(*style.text_color), label)
+    return colors
 
 
 def draw_circle(canvas, x: int, y: int, color):
@@ -74,16 +59,37 @@ def draw_circle(canvas, x: int, y: int, color):
     graphics.DrawLine(canvas, x + 2, y + 8, x + 6, y + 8, color)
 
 
+def draw_pill(canvas, x: int, y: int, width: int, color):
+    """Draw a filled bullet as wide as `width`, for route names too long for the circle"""
+    graphics.DrawLine(canvas, x + 1, y + 0, x + width - 2, y + 0, color)
+    for row in range(1, 8):
+        graphics.DrawLine(canvas, x, y + row, x + width - 1, y + row, color)
+    graphics.DrawLine(canvas, x + 1, y + 8, x + width - 2, y + 8, color)
+
+
 class DisplayRenderer:
     """Renders train arrivals to the RGB matrix display"""
 
-    def __init__(self, display_duration: float = 5.0):
+    def __init__(self, display_duration: float = 5.0, max_age_s: Optional[float] = None):
         self.display_duration = display_duration
+        # Oldest feed data a stop may be shown with; None uses the hub's PollPolicy.max_age_s (config
+        # "polling"). Feeds have their next poll moved to meet a stop's slot (see FeedHub.ensure_fresh).
+        self.max_age_s = max_age_s
         self.running = False
         self.mode = 'arrivals'  # 'arrivals' or 'animations'
         self.thread: Optional[threading.Thread] = None
         self.buffers: Dict[str, DataBuffers] = {}
         self.stop_names: Dict[str, str] = {}
+        self.route_colors: Dict[str, Tuple] = {}
+        self._default_route_color = graphics.Color(*DEFAULT_ROUTE_STYLE.color)
+        self._default_label_color = graphics.Color(*DEFAULT_ROUTE_STYLE.text_color)
+        # Connections board: after each stop, the next catchable train at its transfer stations
+        self.show_connections = False
+        self.connections_source: Optional[Callable[[str], List[Dict]]] = None
+        # Told which stops the rotation is showing (none while stopped), so unwatched feeds can idle
+        self.demand_sink: Optional[Callable[[List[str]], None]] = None
+        # Called with (stop_id, show_at, max_age_s) ahead of each stop's slot
+        self.freshness_sink: Optional[Callable[[str, float, Optional[float]], None]] = None
         self._stop_evt = threading.Event()
         self._broadcast_message: Optional[str] = None
         self._broadcast_lock = threading.Lock()
@@ -100,6 +106,10 @@ class DisplayRenderer:
         self.icon_font = graphics.Font()
         self.icon_font.LoadFont(os.path.join(ASSETS_DIR, "fonts/6x10.bdf"))
 
+        # Narrow font for route names longer than the two characters a circle bullet fits
+        self.label_font = graphics.Font()
+        self.label_font.LoadFont(os.path.join(ASSETS_DIR, "fonts/tom-thumb.bdf"))
+
         # Load larger font for broadcast messages
         self.broadcast_font = graphics.Font()
         self.broadcast_font.LoadFont(os.path.join(ASSETS_DIR, "fonts/helvR12.bdf"))
@@ -109,6 +119,10 @@ class DisplayRenderer:
         self.buffers = buffers
         self.stop_names = stop_names
 
+    def set_routes(self, routes: Dict[str, Route]):
+        """Precompute the route bullet colors from routes.txt (subway and bus)"""
+        self.route_colors = build_route_colors(routes)
+
     def show_broadcast(self, message: str, duration: float = 10.0):
         """Show a scrolling broadcast message for the specified duration"""
         with self._broadcast_lock:
@@ -137,6 +151,7 @@ class DisplayRenderer:
         self._stop_evt.set()
         if self.thread:
             self.thread.join(timeout=5)
+        self._report_demand([])
         self._clear_display()
         print("Display renderer stopped")
 
@@ -159,6 +174,7 @@ class DisplayRenderer:
                     continue
 
             stop_ids = list(self.buffers.keys())
+            self._report_demand(stop_ids)
 
             if not stop_ids:
                 self._clear_display()
@@ -166,7 +182,7 @@ class DisplayRenderer:
                 self._stop_evt.clear()
                 continue
 
-            for stop_id in stop_ids:
+            for i, stop_id in enumerate(stop_ids):
                 if not self.running:
                     break
 
@@ -175,26 +191,99 @@ class DisplayRenderer:
                     if self._broadcast_message:
                         break
 
-                self._render_stop(stop_id)
-                self._stop_evt.wait(self.display_duration)
+                # This stop should already be fresh from the last slot's request. The next one
+                # follows this stop's slot and, with connections on, its connections slot
+                next_stop_id = stop_ids[(i + 1) % len(stop_ids)]
+                with_connections = self.show_connections and self.connections_source is not None
+                now = time.time()
+                self._request_fresh(stop_id, now)
+                slots = 2 if with_connections else 1
+                self._request_fresh(next_stop_id, now + slots * self.display_duration)
+                self._show_stop(stop_id)
                 self._stop_evt.clear()
 
+                if with_connections:
+                    if not self._show_connections(stop_id):
+                        # No connections board after all: the next stop is up now
+                        self._request_fresh(next_stop_id, time.time())
+                    self._stop_evt.clear()
+
+    def _report_demand(self, stop_ids: List[str]):
+        if self.demand_sink is None:
+            return
+        try:
+            self.demand_sink(stop_ids)
+        except Exception as e:
+            print(f"Error reporting display demand: {e}")
+
+    def _request_fresh(self, stop_id: str, show_at: float):
+        if self.freshness_sink is None:
+            return
+        try:
+            self.freshness_sink(stop_id, show_at, self.max_age_s)
+        except Exception as e:
+            print(f"Error requesting fresh arrivals for {stop_id}: {e}")
+
+    def _show_stop(self, stop_id: str):
+        """Show a stop for one display slot, redrawing whenever a countdown ticks over or new arrivals land"""
+        slot_end = time.time() + self.display_duration
+        while self.running:
+            self._render_stop(stop_id)
+
+            buffers = self.buffers.get(stop_id)
+            version = buffers.version if buffers else 0
+            next_change = buffers.next_change() if buffers else None
+            wake_at = slot_end if next_change is None else min(slot_end, next_change + MINUTE_TICK_SLACK)
+            # Check the buffers' version between ticks; redraw only if it moved
+            while True:
+                check_at = min(wake_at, time.time() + BUFFER_CHECK_S)
+                if self._stop_evt.wait(max(0.0, check_at - time.time())):
+                    return
+                if check_at >= wake_at or (buffers is not None and buffers.changed_since(version)):
+                    break
+            if wake_at >= slot_end:
+                return
+
+    def _show_connections(self, stop_id: str) -> bool:
+        """Show a stop's connections board for one display slot, if it has any; returns whether it did"""
+        try:
+            rows = self.connections_source(stop_id)
+        except Exception as e:
+            print(f"Error getting connections for {stop_id}: {e}")
+            return False
+        if not rows:
+            return False
+
+        print(f"Rendering connections for {stop_id}")
+        self._draw_rows(rows, WHITE, stale=False)
+        self._stop_evt.wait(self.display_duration)
+        return True
+
     def _render_stop(self, stop_id: str):
         """Render a single stop's arrivals to the display"""
         if stop_id not in self.buffers:
             return
 
         buffers = self.buffers[stop_id]
-        _, data = buffers.snapshot()
+        # One board read, so the dimming always matches the rows drawn
+        board = buffers.board
+        stale = board.stale
+        _, data = buffers.snapshot(board=board)
+        # Arrivals restored from the on-disk cache are drawn dimmed until a live fetch lands
+        row_color = DIM_WHITE if stale else WHITE
         stop_name = self.stop_names.get(stop_id, stop_id)
 
         print(f"Rendering {stop_id}: {stop_name}")
+        self._draw_rows(data, row_color, stale)
 
+    def _draw_rows(self, data: List[Dict], row_color, stale: bool):
+        """Draw up to three route/text/status rows and swap them onto the display"""
         # Clear canvas
         self.canvas.Fill(0, 0, 0)
 
         WIDTH = 64
         x_pos = 0
+        prev_direction = None
 
         for row_id in range(min(3, len(data))):
             row = data[row_id]
@@ -205,19 +294,37 @@ class DisplayRenderer:
             if not route:
                 continue
 
-            # Draw route circle
-            draw_circle(self.canvas, 0, x_pos + 1, get_route_color(route))
-
-            # Draw route letter
-            graphics.DrawText(self.canvas, self.icon_font, 2, x_pos + 9, BLACK, route)
+            # Station boards list uptown then downtown rows; rule a line between them
+            direction = row.get("direction", "")
+            if prev_direction is not None and direction != prev_direction:
+                graphics.DrawLine(self.canvas, 13, x_pos - 1, self.canvas.width - 1, x_pos - 1, DIM_WHITE)
+            prev_direction = direction
+
+            route_color = self.route_colors.get(route)
+            if route_color is None:
+                route_color = (self._default_route_color, self._default_label_color, route)
+            bullet_color, label_color, label = route_color
+
+            text_x = 13
+            if len(label) <= 2:
+                # Draw route circle and letter
+                draw_circle(self.canvas, 0, x_pos + 1, bullet_color)
+                graphics.DrawText(self.canvas, self.icon_font, 2, x_pos + 9, label_color, label)
+            else:
+                # Long (bus) names: full name in the narrow font on a bullet sized to fit,
+                # pushing the destination right
+                pill_width = 4 * len(label) + 1
+                draw_pill(self.canvas, 0, x_pos + 1, pill_width, bullet_color)
+                graphics.DrawText(self.canvas, self.label_font, 1, x_pos + 7, label_color, label)
+                text_x = max(text_x, pill_width + 3)
 
             # Choose text color (green for arriving now)
-            text_color = WHITE
-            if status.strip() == "0m":
+            text_color = row_color
+            if status.strip() == "0m" and not stale:
                 text_color = GREEN
 
             # Draw destination and time
-            graphics.DrawText(self.canvas, self.icon_font, 13, x_pos + 9, text_color, txt)
+            graphics.DrawText(self.canvas, self.icon_font, text_x, x_pos + 9, text_color, txt)
             graphics.DrawText(self.canvas, self.icon_font, WIDTH + 7, x_pos + 9, text_color, status)
 
             x_pos += 10
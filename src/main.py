@@ -2,52 +2,104 @@
 RGB Matrix Web API Service
 Can be imported and controlled from main.py
 """
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+import gzip
+import hashlib
 import json
 import subprocess
 import threading
 import time
 import os
-from typing import Optional, List, Dict, Callable
-from transit.worker import load_stop_data, load_all_stops, MTAWorker, DataBuffers
-from config import load_selected_stops, save_selected_stops, load_scripts, save_scripts
+from urllib.parse import urlsplit
+from typing import Optional, List, Dict, Callable, Tuple
+from transit.worker import load_stop_data, format_minutes, StopTable, ArrivalFilter, DataBuffers, PollPolicy, ArrivalCache, shared_feed_hub, set_feed_base_url
+from transit.gtfs_cache import load_static_gtfs
+from transit.gtfs_import import DEFAULT_SOURCES, import_gtfs_zip
+from transit.search import StopSearchIndex
+from transit.spatial import StopGrid
+from config import load_selected_stops, save_selected_stops, load_scripts, save_scripts, load_polling_config, load_bus_api_key, load_stop_filters, save_stop_filters, load_gtfs_sources, ARRIVAL_CACHE_FILE, GTFS_CACHE_FILE
 from display import DisplayRenderer
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# How long an /api/arrivals request keeps its stops' feeds polling; the UI refreshes every 10s
+API_DEMAND_TTL_S = 60.0
+
 WEB_DIR = os.path.join(os.path.dirname(__file__), "..", "ui", "dist")
 ASSETS_DIR = os.path.join(WEB_DIR, "assets")
 
 class StopWorkersManager:
-    """Manages MTAWorker instances for configured stops"""
+    """Manages feed subscriptions and buffers for configured stops"""
 
     def __init__(self, api_key: str = ""):
         self.api_key = api_key
-        self.workers: Dict[str, MTAWorker] = {}
+        self.bus_api_key = load_bus_api_key()
         self.buffers: Dict[str, DataBuffers] = {}
         self.stops_data: Dict = {}
         self._load_stops_data()
+        self.hub = shared_feed_hub(
+            stops=self.stops_data,
+            api_key=api_key,
+            policy=PollPolicy.from_dict(load_polling_config()),
+            cache=ArrivalCache(ARRIVAL_CACHE_FILE),
+            router=self.route_index,
+            headsigns=self.headsign_index,
+            platforms=self.static_gtfs.platforms,
+            bus_api_key=self.bus_api_key,
+            filters={stop_id: ArrivalFilter.from_dict(f) for stop_id, f in load_stop_filters().items()},
+        )
 
     def _load_stops_data(self):
-        """Load all stops data from file (trains and buses)"""
+        """Load stops (trains and buses), the stop -> feed routing table and trip headsigns from the compiled GTFS cache"""
         data_dir = os.path.join(os.path.dirname(__file__), 'transit', 'data')
-        self.stops_data = load_all_stops(data_dir)
+        self._apply_static(load_static_gtfs(data_dir, GTFS_CACHE_FILE))
+
+    def _apply_static(self, static_gtfs):
+        self.static_gtfs = static_gtfs
+        self.stops_data = static_gtfs.stops
+        self.route_index = static_gtfs.route_index
+        self.headsign_index = static_gtfs.headsigns
+        self.transfer_graph = static_gtfs.transfer_graph
+
+    def reload_static_data(self):
+        """
+        Reload static GTFS (e.g. after transit/gtfs_import.py replaced the
+        tables) and swap it in while feeds keep polling. Each index is
+        replaced by a single assignment, so readers see the old or new one.
+        """
+        data_dir = os.path.join(os.path.dirname(__file__), 'transit', 'data')
+        static_gtfs = load_static_gtfs(data_dir, GTFS_CACHE_FILE)
+        dropped = self.hub.replace_static(
+            stops=static_gtfs.stops,
+            router=static_gtfs.route_index,
+            headsigns=static_gtfs.headsigns,
+            platforms=static_gtfs.platforms,
+        )
+        self._apply_static(static_gtfs)
+        # Drop buffers for stops the hub let go of
+        for stop_id in dropped:
+            self.buffers.pop(stop_id, None)
 
     def start_workers(self, stop_ids: List[str]):
-        """Start workers for the given stop IDs"""
-        # Stop any workers that are no longer needed
-        current_ids = set(self.workers.keys())
+        """Subscribe the given stop IDs to the feed hub"""
+        # Drop stops that are no longer needed
+        current_ids = set(self.buffers.keys())
         new_ids = set(stop_ids)
 
         for stop_id in current_ids - new_ids:
             self._stop_worker(stop_id)
 
-        # Start workers for new stops
+        # Subscribe new stops
         for stop_id in new_ids - current_ids:
             self._start_worker(stop_id)
 
     def _start_worker(self, stop_id: str):
-        """Start a worker for a specific stop"""
-        if stop_id in self.workers:
+        """Subscribe a specific stop to its feed"""
+        if stop_id in self.buffers:
             return
 
         if stop_id not in self.stops_data:
@@ -56,36 +108,29 @@ class StopWorkersManager:
 
         stop = self.stops_data[stop_id]
 
-        # Skip bus stops for now - bus GTFS-RT feeds are not yet configured
-        if stop.transit_type == "bus":
-            print(f"Skipping worker for bus stop {stop_id} (bus feeds not yet supported)")
+        # Bus Time needs its own key; without one every poll would be rejected
+        if stop.transit_type == "bus" and not self.bus_api_key:
+            print(f"Skipping worker for bus stop {stop_id} (no bus_api_key configured)")
             return
 
         buffers = DataBuffers()
-        worker = MTAWorker(
-            stops=self.stops_data,
-            configured_stop_ids=[stop_id],
-            refresh_s=30.0,
-            api_key=self.api_key,
-            buffers=buffers,
-            name=f"worker-{stop_id}",
-        )
-        worker.start()
+        try:
+            feed_urls = self.hub.subscribe(stop_id, buffers)
+        except ValueError as e:
+            print(f"Cannot subscribe stop {stop_id}: {e}")
+            return
 
-        self.workers[stop_id] = worker
         self.buffers[stop_id] = buffers
-        print(f"Started worker for stop {stop_id}")
+        print(f"Subscribed stop {stop_id} to {', '.join(feed_urls)}")
 
     def _stop_worker(self, stop_id: str):
-        """Stop a worker for a specific stop"""
-        if stop_id not in self.workers:
+        """Unsubscribe a specific stop"""
+        if stop_id not in self.buffers:
             return
 
-        worker = self.workers[stop_id]
-        worker.stop()
-        del self.workers[stop_id]
+        self.hub.unsubscribe(stop_id)
         del self.buffers[stop_id]
-        print(f"Stopped worker for stop {stop_id}")
+        print(f"Unsubscribed stop {stop_id}")
 
     def get_stop_names(self) -> Dict[str, str]:
         """Get stop names for all configured stops"""
@@ -94,23 +139,94 @@ class StopWorkersManager:
             for stop_id in self.buffers.keys()
         }
 
+    def set_stop_filters(self, filters: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Apply per-stop route/direction/destination filters to the feed indexes; returns the normalized filters"""
+        parsed = {stop_id: ArrivalFilter.from_dict(f) for stop_id, f in filters.items()}
+        self.hub.set_filters(parsed)
+        return {stop_id: f.to_dict() for stop_id, f in parsed.items() if f}
+
+    def set_demand(self, consumer: str, stop_ids, ttl_s: Optional[float] = None):
+        """Tell the feed hub which stops a consumer is showing (see FeedHub.set_demand)"""
+        self.hub.set_demand(consumer, [stop_id for stop_id in stop_ids if stop_id in self.buffers], ttl_s=ttl_s)
+
+    def ensure_fresh(self, stop_id: str, show_at: float, max_age_s: Optional[float] = None):
+        """Have the feed hub move a stop's next feed polls to land before show_at if needed (see FeedHub.ensure_fresh)"""
+        self.hub.ensure_fresh(stop_id, show_at, max_age_s)
+
     def get_arrivals(self) -> Dict:
         """Get arrivals for all configured stops"""
         result = {}
         for stop_id, buffers in self.buffers.items():
-            lines, data = buffers.snapshot()
+            board = buffers.board
+            lines, data = buffers.snapshot(board=board)
             stop_info = self.stops_data.get(stop_id)
             result[stop_id] = {
                 'stop_name': stop_info.name if stop_info else stop_id,
                 'lines': lines,
                 'arrivals': data,
+                'stale': board.stale,
+                'updated_at': board.updated_at,
+                'version': board.version,
             }
         return result
 
+    def get_connections(self, stop_id: str) -> Optional[Dict]:
+        """
+        Arrivals at a stop's walk-transfer stations that can still be made,
+        i.e. leaving at least min_transfer_time from now. Read from the feeds
+        already being polled; stations on other feeds are marked unavailable.
+        """
+        stop = self.stops_data.get(stop_id)
+        if stop is None:
+            return None
+        now = time.time()
+        station_id = stop.parent_station_id or stop_id
+
+        connections = []
+        for to_station_id, min_transfer_time in self.transfer_graph.transfers_from(station_id):
+            to_station = self.stops_data.get(to_station_id)
+            arrivals = self.hub.peek_arrivals(to_station_id)
+            catchable = [a for a in arrivals or [] if a.when.timestamp() >= now + min_transfer_time]
+            connections.append({
+                'station_id': to_station_id,
+                'stop_name': to_station.name if to_station else to_station_id,
+                'min_transfer_time': min_transfer_time,
+                'available': arrivals is not None,
+                'arrivals': [self._arrival_entry(a, now) for a in catchable],
+            })
+
+        return {
+            'stop_id': stop_id,
+            'stop_name': stop.name,
+            'station_id': station_id,
+            'connections': connections,
+        }
+
+    def _arrival_entry(self, arrival, now: float) -> Dict:
+        destination = self.stops_data.get(arrival.destination)
+        epoch = int(arrival.when.timestamp())
+        return {
+            'route_id': arrival.route_id,
+            'text': destination.name if destination else arrival.destination,
+            'direction': arrival.direction,
+            'status': format_minutes(epoch, now),
+            'epoch': epoch,
+        }
+
+    def get_connection_rows(self, stop_id: str) -> List[Dict]:
+        """Display rows for a stop's connections: the next catchable train at each transfer station"""
+        connections = self.get_connections(stop_id)
+        rows = []
+        for connection in (connections or {}).get('connections', []):
+            if connection['arrivals']:
+                rows.append(connection['arrivals'][0])
+        return sorted(rows, key=lambda row: row['epoch'])
+
     def stop_all(self):
-        """Stop all workers"""
-        for stop_id in list(self.workers.keys()):
+        """Unsubscribe all stops and stop the feed hub"""
+        for stop_id in list(self.buffers.keys()):
             self._stop_worker(stop_id)
+        self.hub.stop()
 
 
 class MatrixController:
@@ -238,6 +354,67 @@ class MatrixController:
 
 
 
+def _stop_entries(table: StopTable, stations) -> List[Dict]:
+    """API representation of every stop in the table, built from its columns; stations are parent station ids"""
+    entries = []
+    for stop_id, name, lat, lon, line, transit_type in zip(
+            table.stop_ids, table.names, table.lat.tolist(), table.lon.tolist(),
+            table.column('line'), table.column('transit_type')):
+        station = stop_id in stations
+        if transit_type == "train" and not station:
+            direction = 'Northbound' if stop_id.endswith('N') else 'Southbound'
+        else:
+            # Bus stops don't have direction suffixes; a station covers both directions
+            direction = ''
+        entries.append({
+            'stop_id': stop_id,
+            'stop_name': name,
+            'lat': lat,
+            'lon': lon,
+            'line': line,
+            'direction': direction,
+            'type': transit_type,
+            'station': station
+        })
+    return entries
+
+
+def _cross_origin(req) -> bool:
+    """Whether a browser request came from a page on another origin (CORS is open for the read APIs)"""
+    origin = req.headers.get('Origin')
+    return bool(origin) and urlsplit(origin).netloc != req.host
+
+
+class PrecomputedResponse:
+    """
+    A JSON response serialized once and kept raw, gzip- and (if the brotli
+    package is installed) brotli-compressed, served with a strong ETag.
+    """
+
+    def __init__(self, payload):
+        self.body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.blake2b(self.body, digest_size=16).hexdigest()
+        self.encoded = {'gzip': gzip.compress(self.body, compresslevel=9)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.body)
+
+    def to_response(self, req) -> Response:
+        if self.etag in req.if_none_match:
+            response = Response(status=304)
+        else:
+            # Smallest encoding the client accepts, else the raw body
+            body, encoding = self.body, None
+            for name, data in self.encoded.items():
+                if name in req.accept_encodings and len(data) < len(body):
+                    body, encoding = data, name
+            response = Response(body, mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
 
 class WebAPIService:
     """Flask web API service for RGB matrix control"""
@@ -257,9 +434,21 @@ class WebAPIService:
         self.port = port
         self.app = Flask(__name__)
         CORS(self.app)
+        # Lets the app run against a local replay server (see transit/replay.py), optionally for only
+        # some feed groups (comma-separated FEED_URLS keys) while the rest stay on MTA's servers
+        feed_base_url = os.environ.get('TRAINSIGN_FEED_BASE_URL')
+        if feed_base_url:
+            feed_groups = [g for g in os.environ.get('TRAINSIGN_FEED_GROUPS', '').split(',') if g.strip()]
+            set_feed_base_url(feed_base_url, feed_groups or None)
         self.workers_manager = StopWorkersManager(api_key=api_key)
+        # (stops dict they were built from, /api/stops response, stop table, its API entries, spatial index, search index)
+        self._stops_payload = None
+        self._import_thread: Optional[threading.Thread] = None
+        self._import_status: Dict = {'state': 'idle'}
         self.display_renderer = DisplayRenderer(display_duration=5.0)
+        self.display_renderer.set_routes(self.workers_manager.static_gtfs.routes)
         self._setup_routes()
+        self._stop_views()
         self.server_thread = None
         self._running = False
 
@@ -270,12 +459,53 @@ class WebAPIService:
             self._update_display_buffers()
             self.display_renderer.start()
 
+    def _stop_views(self) -> Tuple[PrecomputedResponse, StopTable, List[Dict], StopGrid, StopSearchIndex]:
+        """
+        The /api/stops payload, the columnar table of the listed stops with
+        their API entries (by row), and the spatial and name indexes behind
+        /api/stops/nearby and /api/stops/search, rebuilt only when the loaded
+        stops change
+        """
+        all_stops = self.workers_manager.stops_data
+        cached = self._stops_payload
+        if cached is not None and cached[0] is all_stops:
+            return cached[1:]
+
+        platforms = self.workers_manager.static_gtfs.platforms
+        listed = {}
+        for stop in all_stops.values():
+            # For trains, include directional stops (N/S suffix) and the stations that group them
+            if stop.transit_type == "train" and stop.stop_id not in platforms:
+                if not (stop.stop_id.endswith('N') or stop.stop_id.endswith('S')):
+                    continue
+            listed[stop.stop_id] = stop
+
+        table = StopTable(listed)
+        entries = _stop_entries(table, platforms)
+        views = (PrecomputedResponse(entries), table, entries, StopGrid(table), StopSearchIndex(listed.values()))
+        self._stops_payload = (all_stops,) + views
+        return views
+
+    def _run_gtfs_import(self, source: str, feed: str):
+        try:
+            tables = import_gtfs_zip(source, feed=feed)
+            self.workers_manager.reload_static_data()
+            self.display_renderer.set_routes(self.workers_manager.static_gtfs.routes)
+            self._update_display_buffers()
+            self._import_status = {'state': 'done', 'source': source, 'feed': feed, 'tables': tables}
+        except Exception as e:
+            print(f"GTFS import from {source} failed: {e}")
+            self._import_status = {'state': 'failed', 'source': source, 'feed': feed, 'error': str(e)}
+
     def _update_display_buffers(self):
         """Update display renderer with current worker buffers"""
         self.display_renderer.set_buffers(
             self.workers_manager.buffers,
             self.workers_manager.get_stop_names()
         )
+        self.display_renderer.connections_source = self.workers_manager.get_connection_rows
+        self.display_renderer.demand_sink = lambda stop_ids: self.workers_manager.set_demand('display', stop_ids)
+        self.display_renderer.freshness_sink = self.workers_manager.ensure_fresh
 
     def _setup_routes(self):
         """Setup Flask routes"""
@@ -405,31 +635,44 @@ class WebAPIService:
         @self.app.route('/api/stops', methods=['GET'])
         def get_stops():
             """Return all stops with coordinates, including trains and buses"""
-            data_dir = os.path.join(os.path.dirname(__file__), 'transit', 'data')
-            all_stops = load_all_stops(data_dir)
-
-            result_stops = []
-            for stop in all_stops.values():
-                # For trains, only include directional stops (N/S suffix)
-                if stop.transit_type == "train":
-                    if not (stop.stop_id.endswith('N') or stop.stop_id.endswith('S')):
-                        continue
-                    direction = 'Northbound' if stop.stop_id.endswith('N') else 'Southbound'
-                else:
-                    # Bus stops don't have direction suffixes
-                    direction = ''
-
-                result_stops.append({
-                    'stop_id': stop.stop_id,
-                    'stop_name': stop.name,
-                    'lat': float(stop.lat),
-                    'lon': float(stop.lon),
-                    'line': stop.line,
-                    'direction': direction,
-                    'type': stop.transit_type
-                })
+            return self._stop_views()[0].to_response(request)
 
-            return jsonify(result_stops)
+        @self.app.route('/api/stops/nearby', methods=['GET'])
+        def get_nearby_stops():
+            """Return the stops nearest to lat/lon, closest first, with their distance in meters"""
+            try:
+                lat = float(request.args['lat'])
+                lon = float(request.args['lon'])
+                radius = request.args.get('radius', type=float)
+                limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+            except (KeyError, ValueError):
+                return jsonify({'error': 'lat and lon are required numbers'}), 400
+            transit_type = request.args.get('type') or None
+            if transit_type not in (None, 'train', 'bus'):
+                return jsonify({'error': "type must be 'train' or 'bus'"}), 400
+
+            _, _, entries, grid, _ = self._stop_views()
+            nearby = grid.nearest(lat, lon, limit=limit, radius_m=radius, transit_type=transit_type)
+            return jsonify([
+                dict(entries[record.row], distance_m=round(distance, 1))
+                for distance, record in nearby
+            ])
+
+        @self.app.route('/api/stops/search', methods=['GET'])
+        def search_stops():
+            """Return stops whose name (or bus stop description) matches q, best match first"""
+            query = request.args.get('q', '')
+            limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+            transit_type = request.args.get('type') or None
+            if transit_type not in (None, 'train', 'bus'):
+                return jsonify({'error': "type must be 'train' or 'bus'"}), 400
+
+            _, table, entries, _, index = self._stop_views()
+            matches = index.search(query, limit=limit, transit_type=transit_type)
+            return jsonify([
+                dict(entries[table.index[stop.stop_id]], score=round(score, 3))
+                for score, stop in matches
+            ])
 
         @self.app.route('/api/selected-stops', methods=['GET'])
         def get_selected_stops():
@@ -458,12 +701,83 @@ class WebAPIService:
                 self.display_renderer.stop()
             return jsonify({'status': 'success', 'selected_stops': stop_ids})
 
+        @self.app.route('/api/stop-filters', methods=['GET'])
+        def get_stop_filters():
+            """Return the saved per-stop arrival filters"""
+            return jsonify({'stop_filters': load_stop_filters()})
+
+        @self.app.route('/api/stop-filters', methods=['POST'])
+        def save_stop_filters_endpoint():
+            """Save per-stop arrival filters and re-index the affected feeds"""
+            data = request.json or {}
+            filters = data.get('stop_filters', {})
+
+            if not isinstance(filters, dict) or not all(isinstance(f, dict) for f in filters.values()):
+                return jsonify({'error': 'stop_filters must map stop ids to filter objects'}), 400
+            for stop_id, f in filters.items():
+                for key in ('routes', 'directions', 'destinations'):
+                    if not isinstance(f.get(key, []), list):
+                        return jsonify({'error': f'{key} for stop {stop_id} must be a list'}), 400
+
+            filters = self.workers_manager.set_stop_filters(filters)
+            save_stop_filters(filters)
+            return jsonify({'status': 'success', 'stop_filters': filters})
+
         @self.app.route('/api/arrivals', methods=['GET'])
         def get_arrivals():
             """Return current arrivals for all configured stops"""
+            # An open UI keeps the feeds polling even while the panel plays animations
+            self.workers_manager.set_demand('api', list(self.workers_manager.buffers), ttl_s=API_DEMAND_TTL_S)
             arrivals = self.workers_manager.get_arrivals()
             return jsonify(arrivals)
 
+        @self.app.route('/api/feeds', methods=['GET'])
+        def get_feeds():
+            """Return per-feed fetch counters (parses avoided, 304s, ...)"""
+            return jsonify(self.workers_manager.hub.stats())
+
+        @self.app.route('/api/connections/<stop_id>', methods=['GET'])
+        def get_connections(stop_id):
+            """Return catchable arrivals at the walk-transfer stations of a stop"""
+            connections = self.workers_manager.get_connections(stop_id)
+            if connections is None:
+                return jsonify({'error': f'unknown stop {stop_id}'}), 404
+            return jsonify(connections)
+
+        @self.app.route('/api/display/connections', methods=['POST'])
+        def set_display_connections():
+            """Turn the connections board (shown after each stop) on or off"""
+            data = request.json or {}
+            self.display_renderer.show_connections = bool(data.get('enabled', True))
+            return jsonify({'show_connections': self.display_renderer.show_connections})
+
+        @self.app.route('/api/gtfs/import', methods=['POST'])
+        def import_gtfs():
+            """Import one of a feed's configured GTFS zips in the background and hot-reload it; same-origin only"""
+            if _cross_origin(request):
+                return jsonify({'error': 'GTFS imports are only accepted from this app'}), 403
+            data = request.json or {}
+            feed = data.get('feed', 'subway')
+            configured = load_gtfs_sources()
+            sources = configured.get(feed) or ([DEFAULT_SOURCES[feed]] if feed in DEFAULT_SOURCES else [])
+            if not sources:
+                return jsonify({'error': f'no GTFS source configured for feed {feed!r}'}), 400
+            source = data.get('source') or sources[0]
+            if source not in sources:
+                return jsonify({'error': f'{source} is not a configured GTFS source for {feed}', 'sources': sources}), 403
+            if self._import_thread and self._import_thread.is_alive():
+                return jsonify({'error': 'an import is already running'}), 409
+
+            self._import_status = {'state': 'running', 'source': source, 'feed': feed}
+            self._import_thread = threading.Thread(target=self._run_gtfs_import, args=(source, feed), daemon=True)
+            self._import_thread.start()
+            return jsonify(self._import_status), 202
+
+        @self.app.route('/api/gtfs/import', methods=['GET'])
+        def import_gtfs_status():
+            """Return the state of the last static GTFS import"""
+            return jsonify(self._import_status)
+
         @self.app.route('/api/display/start', methods=['POST'])
         def start_display():
             """Start the display renderer"""
@@ -482,7 +796,8 @@ class WebAPIService:
             """Get display renderer status"""
             return jsonify({
                 'running': self.display_renderer.running,
-                'stops_count': len(self.display_renderer.buffers)
+                'stops_count': len(self.display_renderer.buffers),
+                'show_connections': self.display_renderer.show_connections
             })
 
     def start(self, blocking=False):
@@ -1,4 +1,4 @@
 """MTA transit display module."""
-from .worker import DataBuffers, MTAWorker, load_stop_data
+from .worker import DataBuffers, FeedHub, MTAWorker, StopTable, load_stop_data
 
-__all__ = ["DataBuffers", "MTAWorker", "load_stop_data"]
+__all__ = ["DataBuffers", "FeedHub", "MTAWorker", "StopTable", "load_stop_data"]
@@ -0,0 +1,140 @@
+"""
+Compiled cache of the static GTFS data in transit/data.
+
+Parsing the text files (stops for subway and bus, routes, ~20k trips,
+transfers) takes long enough on a Pi to be noticeable at every start. The
+parsed result is pickled to one file together with the size and mtime of
+every source file it was built from; later loads compare those and either
+unpickle the cache or rebuild it, so editing or replacing a text file
+rebuilds automatically.
+
+File layout: a small pickled header (format version + source fingerprint)
+followed by the pickled StaticGTFS, so a stale cache is detected without
+unpickling the payload.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .gtfs_static import (
+    HeadsignIndex, Route, RouteIndex, Transfer, TransferGraph, load_routes, load_transfers, station_platforms,
+)
+from .worker import TrainStop, load_all_stops
+
+CACHE_VERSION = 5
+
+# Relative to the data directory; missing files are fingerprinted as absent
+SOURCE_FILES: Tuple[str, ...] = (
+    "gtfs_subway/stops.txt",
+    "gtfs_subway/routes.txt",
+    "gtfs_subway/trips.txt",
+    "gtfs_subway/station_routes.txt",
+    "gtfs_subway/stop_times.txt",
+    "gtfs_subway/transfers.txt",
+    "gtfs_busco/stops.txt",
+    "gtfs_busco/routes.txt",
+)
+
+
+@dataclass
+class StaticGTFS:
+    stops: Dict[str, TrainStop]
+    routes: Dict[str, Route]       # subway and bus; their route ids don't collide
+    transfers: List[Transfer]
+    transfer_graph: TransferGraph
+    route_index: RouteIndex
+    headsigns: HeadsignIndex
+    platforms: Dict[str, Tuple[str, ...]]  # parent station -> platform stop ids
+
+
+def source_fingerprint(data_dir: str) -> Tuple[Tuple[str, int, int], ...]:
+    """(relative path, size, mtime_ns) of each source file; size -1 if it's missing."""
+    entries = []
+    for rel_path in SOURCE_FILES:
+        try:
+            st = os.stat(Path(data_dir) / rel_path)
+            entries.append((rel_path, st.st_size, st.st_mtime_ns))
+        except OSError:
+            entries.append((rel_path, -1, 0))
+    return tuple(entries)
+
+
+def build_static_gtfs(data_dir: str) -> StaticGTFS:
+    """Parse the static GTFS text files."""
+    data = Path(data_dir)
+    stops = load_all_stops(data_dir)
+
+    routes: Dict[str, Route] = {}
+    for routes_txt in (data / "gtfs_busco" / "routes.txt", data / "gtfs_subway" / "routes.txt"):
+        if routes_txt.exists():
+            routes.update(load_routes(str(routes_txt)))
+
+    transfers_txt = data / "gtfs_subway" / "transfers.txt"
+    transfers = load_transfers(str(transfers_txt)) if transfers_txt.exists() else []
+
+    return StaticGTFS(
+        stops=stops,
+        routes=routes,
+        transfers=transfers,
+        transfer_graph=TransferGraph.from_transfers(transfers),
+        route_index=RouteIndex.build(data_dir, stops),
+        headsigns=HeadsignIndex.build(data_dir),
+        platforms=station_platforms(stops),
+    )
+
+
+def _read_cache(cache_path: Path, fingerprint) -> Optional[StaticGTFS]:
+    try:
+        with cache_path.open("rb") as f:
+            header = pickle.load(f)
+            if header != {"version": CACHE_VERSION, "sources": fingerprint}:
+                return None
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Truncated or written by an incompatible version of the code; just rebuild
+        print(f"Ignoring unreadable GTFS cache {cache_path}: {e}")
+        return None
+
+
+def _write_cache(cache_path: Path, fingerprint, static: StaticGTFS) -> None:
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "sources": fingerprint}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(static, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Failed to write GTFS cache {cache_path}: {e}")
+
+
+def load_static_gtfs(data_dir: str, cache_path: Optional[str] = None) -> StaticGTFS:
+    """
+    Static GTFS for data_dir, from the compiled cache when it matches the
+    source files, otherwise parsed from text (and the cache rewritten).
+    """
+    fingerprint = source_fingerprint(data_dir)
+    path = Path(cache_path) if cache_path else None
+
+    if path is not None:
+        static = _read_cache(path, fingerprint)
+        if static is not None:
+            return static
+
+    t0 = time.perf_counter()
+    static = build_static_gtfs(data_dir)
+    print(f"Parsed static GTFS in {time.perf_counter() - t0:.2f}s "
+          f"({len(static.stops)} stops, {len(static.routes)} routes, {len(static.transfers)} transfers)")
+    if path is not None:
+        _write_cache(path, fingerprint, static)
+    return static
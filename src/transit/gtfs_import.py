@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+gtfs_import.py
+
+Import an MTA static GTFS zip (local file or URL) into transit/data.
+
+Tables are streamed straight out of the zip in fixed-size chunks; tables
+the app doesn't read (shapes.txt, ...) are never decompressed.
+stop_times.txt, by far the largest, is never written out either: for the
+subway it is folded while streaming into station_routes.txt (the station ->
+routes table RouteIndex needs), so neither the import nor the next GTFS
+cache rebuild has to store or re-parse it. The tables are written to a
+staging directory next to the target and swapped in with renames, so a
+failed or interrupted import leaves the current data untouched.
+
+After an import the running app picks the data up with
+StopWorkersManager.reload_static_data(), or via POST /api/gtfs/import.
+
+Usage (from src/):
+  python3 -m transit.gtfs_import gtfs_subway.zip --feed subway
+  python3 -m transit.gtfs_import https://rrgtfsfeeds.s3.amazonaws.com/gtfs_subway.zip --feed subway
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from .gtfs_static import STATION_ROUTES_FILE, build_station_routes, write_station_routes
+from .worker import load_stop_data
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# feed -> data subdirectory
+FEED_DIRS: Dict[str, str] = {
+    "subway": "gtfs_subway",
+    "bus": "gtfs_busco",
+}
+
+# feed -> MTA's published static GTFS zip; the only sources POST /api/gtfs/import accepts unless config.json
+# "gtfs_sources" lists others
+DEFAULT_SOURCES: Dict[str, str] = {
+    "subway": "https://rrgtfsfeeds.s3.amazonaws.com/gtfs_subway.zip",
+    "bus": "https://rrgtfsfeeds.s3.amazonaws.com/gtfs_busco.zip",
+}
+
+# Tables copied as-is; stop_times.txt is folded into STATION_ROUTES_FILE and anything else is skipped
+IMPORTED_TABLES: Tuple[str, ...] = (
+    "agency.txt",
+    "calendar.txt",
+    "calendar_dates.txt",
+    "routes.txt",
+    "stops.txt",
+    "trips.txt",
+    "transfers.txt",
+)
+REQUIRED_TABLES: Tuple[str, ...] = ("stops.txt", "routes.txt")
+
+CHUNK_SIZE = 1 << 16
+
+
+def _download(url: str, timeout_s: float = 60.0) -> str:
+    """Stream a zip to a temp file (zip members need a seekable file); returns its path."""
+    fd, path = tempfile.mkstemp(suffix=".zip")
+    try:
+        with os.fdopen(fd, "wb") as f, requests.get(url, stream=True, timeout=timeout_s) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _members(zf: zipfile.ZipFile) -> Dict[str, zipfile.ZipInfo]:
+    """Table name -> member; some exports nest the tables in a folder."""
+    members: Dict[str, zipfile.ZipInfo] = {}
+    for info in zf.infolist():
+        if not info.is_dir():
+            members.setdefault(Path(info.filename).name, info)
+    return members
+
+
+def import_gtfs_zip(source: str, feed: str = "subway", data_dir: str = DATA_DIR) -> List[str]:
+    """
+    Import the tables of a GTFS zip (path or http(s) URL) into data_dir's
+    directory for feed. Returns the table names written.
+    """
+    if feed not in FEED_DIRS:
+        raise ValueError(f"unknown feed {feed!r}; expected one of {', '.join(FEED_DIRS)}")
+
+    downloaded: Optional[str] = None
+    if source.startswith(("http://", "https://")):
+        downloaded = source = _download(source)
+
+    target = Path(data_dir) / FEED_DIRS[feed]
+    staging = target.with_name(target.name + ".importing")
+    previous = target.with_name(target.name + ".previous")
+    try:
+        with zipfile.ZipFile(source) as zf:
+            members = _members(zf)
+            missing = [name for name in REQUIRED_TABLES if name not in members]
+            if missing:
+                raise ValueError(f"{source} is missing {', '.join(missing)}")
+
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir(parents=True)
+            written = []
+            for name in IMPORTED_TABLES:
+                info = members.get(name)
+                if info is None:
+                    continue
+                with zf.open(info) as src, (staging / name).open("wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                written.append(name)
+
+            if feed == "subway" and "stop_times.txt" in members and "trips.txt" in written:
+                stops = load_stop_data(str(staging / "stops.txt"), transit_type="train")
+                with zf.open(members["stop_times.txt"]) as raw:
+                    rows = csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8", newline=""))
+                    station_routes = build_station_routes(rows, staging / "trips.txt", stops)
+                with (staging / STATION_ROUTES_FILE).open("w", newline="", encoding="utf-8") as dst:
+                    write_station_routes(dst, station_routes)
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                written.append(STATION_ROUTES_FILE)
+
+        # Swap directories with two renames, so the tables are never a mix of old and new
+        shutil.rmtree(previous, ignore_errors=True)
+        if target.exists():
+            os.replace(target, previous)
+        os.replace(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+        print(f"Imported {', '.join(written)} into {target}")
+        return written
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if downloaded:
+            os.unlink(downloaded)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import a static GTFS zip into transit/data")
+    parser.add_argument("source", help="Path or URL of the GTFS zip")
+    parser.add_argument("--feed", choices=sorted(FEED_DIRS), default="subway")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+    import_gtfs_zip(args.source, feed=args.feed, data_dir=args.data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+"""
+Indexes precomputed from the static GTFS files in transit/data.
+
+- routes.txt -> Route records and LED-ready route colors
+- transfers.txt -> Transfer records and the station transfer graph
+- parent station -> platforms, so a station can be followed as one stop
+- stop -> routes -> feed group, so each stop only polls the realtime feeds
+  that can actually contain it (from station_routes.txt, which the importer
+  folds out of stop_times.txt, or stop_times.txt itself)
+- trip pattern -> headsign, to name a train's destination when the realtime
+  feed doesn't carry one
+"""
+
+from __future__ import annotations
+
+import csv
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, TextIO, Tuple
+
+from .worker import TrainStop, resolve_feed_url
+
+
+@dataclass(frozen=True)
+class Route:
+    route_id: str
+    short_name: str
+    long_name: str
+    route_type: str
+    color: str = ""       # hex without '#', as in routes.txt
+    text_color: str = ""
+    agency_id: str = ""
+
+
+def load_routes(routes_txt_path: str) -> Dict[str, Route]:
+    path = Path(routes_txt_path)
+    if not path.exists():
+        raise FileNotFoundError(f"routes file not found: {routes_txt_path}")
+
+    routes: Dict[str, Route] = {}
+    with path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            route_id = row.get("route_id", "").strip()
+            if not route_id:
+                continue
+            routes[route_id] = Route(
+                route_id=route_id,
+                short_name=row.get("route_short_name", "").strip() or route_id,
+                long_name=row.get("route_long_name", "").strip(),
+                route_type=row.get("route_type", "").strip(),
+                color=row.get("route_color", "").strip().upper(),
+                text_color=row.get("route_text_color", "").strip().upper(),
+                agency_id=row.get("agency_id", "").strip(),
+            )
+    return routes
+
+
+@dataclass(frozen=True)
+class Transfer:
+    from_stop_id: str
+    to_stop_id: str
+    transfer_type: int = 0
+    min_transfer_time: int = 0  # seconds
+
+
+def load_transfers(transfers_txt_path: str) -> List[Transfer]:
+    path = Path(transfers_txt_path)
+    if not path.exists():
+        raise FileNotFoundError(f"transfers file not found: {transfers_txt_path}")
+
+    transfers: List[Transfer] = []
+    with path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            from_stop_id = row.get("from_stop_id", "").strip()
+            to_stop_id = row.get("to_stop_id", "").strip()
+            if not from_stop_id or not to_stop_id:
+                continue
+            transfers.append(Transfer(
+                from_stop_id=from_stop_id,
+                to_stop_id=to_stop_id,
+                transfer_type=int(row.get("transfer_type", "").strip() or 0),
+                min_transfer_time=int(row.get("min_transfer_time", "").strip() or 0),
+            ))
+    return transfers
+
+
+class TransferGraph:
+    """
+    station -> walk transfers to other stations, from transfers.txt.
+
+    Same-station entries (a station to itself) are dropped; where a pair is
+    listed more than once the shortest min_transfer_time wins.
+    """
+
+    def __init__(self, edges: Dict[str, Tuple[Tuple[str, int], ...]]) -> None:
+        self._edges = edges
+
+    @classmethod
+    def from_transfers(cls, transfers: Iterable[Transfer]) -> "TransferGraph":
+        shortest: Dict[str, Dict[str, int]] = {}
+        for t in transfers:
+            if t.from_stop_id == t.to_stop_id:
+                continue
+            targets = shortest.setdefault(t.from_stop_id, {})
+            known = targets.get(t.to_stop_id)
+            if known is None or t.min_transfer_time < known:
+                targets[t.to_stop_id] = t.min_transfer_time
+        return cls({
+            station_id: tuple(sorted(targets.items(), key=lambda item: (item[1], item[0])))
+            for station_id, targets in shortest.items()
+        })
+
+    def transfers_from(self, station_id: str) -> Tuple[Tuple[str, int], ...]:
+        """(station_id, min_transfer_time seconds) pairs, quickest walk first."""
+        return self._edges.get(station_id, ())
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+
+@dataclass(frozen=True)
+class RouteStyle:
+    """How a route is drawn on the LED matrix: bullet color, label color and label."""
+    color: Tuple[int, int, int]
+    text_color: Tuple[int, int, int]
+    label: str
+
+
+# routes.txt colors are sRGB meant for screens; LED panels are linear and much
+# brighter, so colors are gamma-expanded and scaled down before use.
+LED_GAMMA = 2.2
+LED_BRIGHTNESS = 0.7
+DEFAULT_ROUTE_STYLE = RouteStyle(color=(90, 90, 90), text_color=(0, 0, 0), label="")
+
+
+def led_rgb(hex_color: str, brightness: float = LED_BRIGHTNESS, gamma: float = LED_GAMMA) -> Tuple[int, int, int]:
+    """'0062CF' -> an (r, g, b) tuple adjusted for LED output."""
+    value = int(hex_color, 16)
+    channels = ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+    return tuple(round(255 * brightness * (c / 255) ** gamma) for c in channels)
+
+
+def route_styles(
+    routes: Dict[str, Route],
+    brightness: float = LED_BRIGHTNESS,
+    gamma: float = LED_GAMMA,
+) -> Dict[str, RouteStyle]:
+    """
+    route -> RouteStyle, keyed by route_id and by short name (bus routes are
+    'Q06' in routes.txt but 'Q6' on the street). Routes without a color get
+    the default gray bullet.
+    """
+    styles: Dict[str, RouteStyle] = {}
+    for route in routes.values():
+        if route.color:
+            style = RouteStyle(
+                color=led_rgb(route.color, brightness, gamma),
+                text_color=led_rgb(route.text_color or "FFFFFF", brightness, gamma),
+                label=route.short_name,
+            )
+        else:
+            style = RouteStyle(DEFAULT_ROUTE_STYLE.color, DEFAULT_ROUTE_STYLE.text_color, route.short_name)
+        styles.setdefault(route.short_name, style)
+        styles[route.route_id] = style
+    return styles
+
+
+# Which realtime feed (FEED_URLS key) publishes each route. The shuttles are
+# published with the trunk they connect to: GS with the numbered lines, the
+# Rockaway Park shuttle (H) with the ACE and the Franklin Av shuttle (FS) with
+# the BDFM.
+FEED_GROUP_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "MAIN": ("1", "2", "3", "4", "5", "6", "7", "GS"),
+    "ACE": ("A", "C", "E", "H"),
+    "BDFM": ("B", "D", "F", "M", "FS"),
+    "G": ("G",),
+    "JZ": ("J", "Z"),
+    "NQRW": ("N", "Q", "R", "W"),
+    "L": ("L",),
+    "SI": ("SI",),
+}
+_ROUTE_FEED_GROUP: Dict[str, str] = {
+    route_id: group for group, route_ids in FEED_GROUP_ROUTES.items() for route_id in route_ids
+}
+
+# Routes that can stop at a station, by the first character of its stop_id
+# (the trunk line it sits on). Only used when neither station_routes.txt nor
+# stop_times.txt is available, or without a RouteIndex at all.
+# Every route that stops anywhere on a trunk is listed, so these over-list: a
+# G-only station also gets the E/F/M/R feeds. FeedHub therefore treats them as
+# candidates and stops polling a feed for a stop once the feed has gone
+# PollPolicy.prune_after_s without carrying it.
+_TRUNK_ROUTES: Dict[str, Tuple[str, ...]] = {
+    "1": ("1", "2", "3"),
+    "2": ("2", "3", "4", "5"),
+    "3": ("3", "4"),
+    "4": ("4", "5", "6"),
+    "5": ("2", "5"),
+    "6": ("4", "5", "6", "6X"),
+    "7": ("7", "7X"),
+    "9": ("GS",),
+    "A": ("A", "B", "C", "D", "E", "F", "M"),
+    "B": ("B", "D", "F", "M", "N", "Q"),
+    "D": ("B", "D", "E", "F", "M", "N", "Q", "FS"),
+    "E": ("E",),
+    "F": ("E", "F", "FX", "G", "M", "R"),
+    "G": ("E", "F", "G", "M", "R"),
+    "H": ("A", "H"),
+    "J": ("J", "M", "Z"),
+    "L": ("L",),
+    "M": ("J", "M", "Z"),
+    "N": ("N", "W"),
+    "Q": ("N", "Q", "R", "W"),
+    "R": ("B", "D", "N", "Q", "R", "W"),
+    "S": ("FS", "SI"),
+}
+
+
+def feed_group_for_route(route_id: str) -> Optional[str]:
+    """FEED_URLS key of the realtime feed that carries a route, or None."""
+    key = route_id.strip().upper()
+    if len(key) > 1 and key.endswith("X"):
+        # Express variants (6X, 7X, FX) share their base route's feed
+        key = key[:-1]
+    return _ROUTE_FEED_GROUP.get(key)
+
+
+def trunk_feed_groups(stop_id: str) -> Tuple[str, ...]:
+    """Feed groups a train stop may be in, from the trunk-line guess alone (see _TRUNK_ROUTES)."""
+    groups = {feed_group_for_route(route_id) for route_id in _TRUNK_ROUTES.get(stop_id[:1].upper(), ())}
+    return tuple(sorted(g for g in groups if g))
+
+
+def _station_id(stop: TrainStop) -> str:
+    return stop.parent_station_id or stop.stop_id
+
+
+def station_platforms(stops: Dict[str, TrainStop]) -> Dict[str, Tuple[str, ...]]:
+    """parent_station -> its platform stop ids (sorted, so N comes before S)."""
+    platforms: Dict[str, List[str]] = {}
+    for stop in stops.values():
+        if stop.parent_station_id and stop.parent_station_id in stops:
+            platforms.setdefault(stop.parent_station_id, []).append(stop.stop_id)
+    return {station_id: tuple(sorted(ids)) for station_id, ids in platforms.items()}
+
+
+class RouteIndex:
+    """
+    stop -> routes -> feed groups, precomputed once from static GTFS.
+
+    Routes are kept per parent station, so a station's N and S platforms share
+    one entry. A stop served by routes on several feeds lists all of them.
+    """
+
+    def __init__(
+        self,
+        station_routes: Dict[str, FrozenSet[str]],
+        stops: Dict[str, TrainStop],
+        source: str,
+    ) -> None:
+        self._station_routes = station_routes
+        self._stops = stops
+        self.source = source  # "stop_times" or "trunk"
+        # Interned per distinct route set; there are only a few dozen of them
+        self._groups_by_routes: Dict[FrozenSet[str], Tuple[str, ...]] = {}
+        for routes in set(station_routes.values()):
+            groups = {feed_group_for_route(route_id) for route_id in routes}
+            self._groups_by_routes[routes] = tuple(sorted(g for g in groups if g))
+
+    @classmethod
+    def build(cls, data_dir: str, stops: Dict[str, TrainStop]) -> "RouteIndex":
+        subway_dir = Path(data_dir) / "gtfs_subway"
+        known_routes = set(load_routes(str(subway_dir / "routes.txt")))
+
+        station_routes_txt = subway_dir / STATION_ROUTES_FILE
+        if station_routes_txt.exists():
+            with station_routes_txt.open("r", newline="", encoding="utf-8") as f:
+                return cls(read_station_routes(f), stops, source="stop_times")
+
+        stop_times = subway_dir / "stop_times.txt"
+        if stop_times.exists():
+            with stop_times.open("r", newline="", encoding="utf-8") as f:
+                station_routes = build_station_routes(csv.DictReader(f), subway_dir / "trips.txt", stops)
+            return cls(station_routes, stops, source="stop_times")
+
+        station_routes = {}
+        for stop in stops.values():
+            if stop.transit_type != "train":
+                continue
+            station_id = _station_id(stop)
+            if station_id in station_routes:
+                continue
+            trunk = _TRUNK_ROUTES.get(station_id[:1].upper(), ())
+            station_routes[station_id] = frozenset(r for r in trunk if r in known_routes)
+        return cls(station_routes, stops, source="trunk")
+
+    @property
+    def exact(self) -> bool:
+        """False when the feeds per stop are trunk-line candidates rather than real stop_times data."""
+        return self.source == "stop_times"
+
+    def routes_for_stop(self, stop_id: str) -> FrozenSet[str]:
+        stop = self._stops.get(stop_id)
+        station_id = _station_id(stop) if stop else stop_id
+        return self._station_routes.get(station_id, frozenset())
+
+    def feed_groups_for_stop(self, stop_id: str) -> Tuple[str, ...]:
+        stop = self._stops.get(stop_id)
+        if stop is not None and stop.transit_type == "bus":
+            # Every bus route is in the one Bus Time feed
+            return ("BUS",)
+        return self._groups_by_routes.get(self.routes_for_stop(stop_id), ())
+
+    def feed_urls_for_stop(self, stop_id: str) -> List[str]:
+        """Distinct feed URLs to poll for a stop (resolved now, so base URL overrides apply)."""
+        urls: List[str] = []
+        for group in self.feed_groups_for_stop(stop_id):
+            url = resolve_feed_url(group)
+            if url not in urls:
+                urls.append(url)
+        return urls
+
+
+# station -> routes, folded out of stop_times.txt by the importer so it needn't be kept
+STATION_ROUTES_FILE = "station_routes.txt"
+
+
+def build_station_routes(
+    stop_times: Iterable[Dict[str, str]],
+    trips_txt_path: Path,
+    stops: Dict[str, TrainStop],
+) -> Dict[str, FrozenSet[str]]:
+    """station -> routes stopping there, from stop_times rows (streamed, never held in memory)."""
+    return _routes_from_stop_times(stop_times, _load_trip_routes(trips_txt_path), stops)
+
+
+def write_station_routes(f: TextIO, station_routes: Dict[str, FrozenSet[str]]) -> None:
+    writer = csv.writer(f)
+    writer.writerow(["station_id", "route_ids"])
+    for station_id in sorted(station_routes):
+        writer.writerow([station_id, " ".join(sorted(station_routes[station_id]))])
+
+
+def read_station_routes(f: TextIO) -> Dict[str, FrozenSet[str]]:
+    return {row["station_id"]: frozenset(row["route_ids"].split()) for row in csv.DictReader(f)}
+
+
+def _load_trip_routes(trips_txt_path: Path) -> Dict[str, str]:
+    trip_routes: Dict[str, str] = {}
+    with trips_txt_path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            trip_routes[row["trip_id"]] = row["route_id"]
+    return trip_routes
+
+
+def _routes_from_stop_times(
+    rows: Iterable[Dict[str, str]],
+    trip_routes: Dict[str, str],
+    stops: Dict[str, TrainStop],
+) -> Dict[str, FrozenSet[str]]:
+    """Fold stop_times rows into station -> routes, one row at a time."""
+    collected: Dict[str, set] = {}
+    for row in rows:
+        route_id = trip_routes.get(row.get("trip_id", ""))
+        if not route_id:
+            continue
+        stop_id = row.get("stop_id", "")
+        stop = stops.get(stop_id)
+        station_id = _station_id(stop) if stop else stop_id
+        collected.setdefault(station_id, set()).add(route_id)
+    return {station_id: frozenset(routes) for station_id, routes in collected.items()}
+
+
+def trip_pattern(trip_id: str) -> str:
+    """
+    The pattern part of an NYCT trip id: '1..S03R' for both the static
+    'AFA25GEN-1038-Sunday-00_000600_1..S03R' and realtime '000600_1..S03R'.
+    """
+    return trip_id.rsplit("_", 1)[-1]
+
+
+def _route_direction(pattern: str) -> str:
+    """'1..S03R' -> '1..S'; "" for patterns that don't follow the route..direction form."""
+    cut = pattern.find("..")
+    return pattern[:cut + 3] if cut > 0 else ""
+
+
+class HeadsignIndex:
+    """
+    trip pattern -> headsign, built from trips.txt.
+
+    The ~20k trips collapse to a few hundred patterns (shape ids) and a few dozen
+    distinct headsigns, so the index stores interned pattern keys mapped to a
+    small int into one shared headsign tuple. Trips whose headsign differs from
+    their pattern's are kept separately by exact trip key; realtime trip ids
+    without a shape suffix fall back to the most common headsign for their
+    route and direction ('1..S').
+    """
+
+    def __init__(
+        self,
+        headsigns: Tuple[str, ...],
+        by_pattern: Dict[str, int],
+        by_route_direction: Dict[str, int],
+        exceptions: Dict[str, int],
+    ) -> None:
+        self._headsigns = headsigns
+        self._by_pattern = by_pattern
+        self._by_route_direction = by_route_direction
+        self._exceptions = exceptions
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, str]]) -> "HeadsignIndex":
+        codes: Dict[str, int] = {}
+        # pattern -> {headsign code: trip count}; patterns are few, so this stays small
+        pattern_counts: Dict[str, Dict[int, int]] = {}
+        trip_codes: Dict[str, Tuple[str, int]] = {}
+
+        for row in rows:
+            headsign = row.get("trip_headsign", "").strip()
+            trip_id = row.get("trip_id", "")
+            if not headsign or not trip_id:
+                continue
+            code = codes.setdefault(sys.intern(headsign), len(codes))
+            pattern = sys.intern(row.get("shape_id", "").strip() or trip_pattern(trip_id))
+            counts = pattern_counts.setdefault(pattern, {})
+            counts[code] = counts.get(code, 0) + 1
+            trip_codes[trip_id.split("_", 1)[-1]] = (pattern, code)
+
+        by_pattern = {pattern: max(counts, key=counts.get) for pattern, counts in pattern_counts.items()}
+
+        direction_counts: Dict[str, Dict[int, int]] = {}
+        for pattern, counts in pattern_counts.items():
+            route_direction = _route_direction(pattern)
+            if not route_direction:
+                continue
+            totals = direction_counts.setdefault(route_direction, {})
+            for code, n in counts.items():
+                totals[code] = totals.get(code, 0) + n
+        by_route_direction = {sys.intern(key): max(counts, key=counts.get) for key, counts in direction_counts.items()}
+
+        exceptions = {
+            sys.intern(trip_key): code
+            for trip_key, (pattern, code) in trip_codes.items()
+            if by_pattern[pattern] != code
+        }
+
+        headsigns = tuple(sorted(codes, key=codes.get))
+        return cls(headsigns, by_pattern, by_route_direction, exceptions)
+
+    @classmethod
+    def build(cls, data_dir: str) -> "HeadsignIndex":
+        trips = Path(data_dir) / "gtfs_subway" / "trips.txt"
+        if not trips.exists():
+            return cls((), {}, {}, {})
+        with trips.open("r", newline="", encoding="utf-8") as f:
+            return cls.from_rows(csv.DictReader(f))
+
+    def resolve(self, trip_id: str) -> str:
+        """Headsign for a realtime trip id, or "" if it can't be resolved."""
+        if not trip_id:
+            return ""
+        code = self._exceptions.get(trip_id)
+        if code is None:
+            pattern = trip_pattern(trip_id)
+            code = self._by_pattern.get(pattern)
+            if code is None:
+                code = self._by_route_direction.get(_route_direction(pattern))
+        return self._headsigns[code] if code is not None else ""
+
+    def __len__(self) -> int:
+        return len(self._by_pattern)
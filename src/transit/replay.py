@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+replay.py
+
+Record real GTFS-RT feed responses and play them back from a local server,
+so the ingestion pipeline can be exercised and benchmarked offline.
+
+- record: polls feeds and stores each distinct response in a zip archive
+- serve:  replays an archive on the FEED_URLS paths at real or accelerated speed
+- bench:  serves an archive in-process and drives a FeedHub with many stops
+
+Archive layout: one deflated member per captured response, named
+    <feed path segment>/<ms since recording start>-<fetch latency ms>.pb
+plus a meta.json with the recording start time.
+
+Usage (from src/):
+  python3 -m transit.replay record --out feeds.zip --feeds ACE BDFM --duration 600
+  python3 -m transit.replay record --out bus.zip --feeds BUS --bus-api-key KEY
+  python3 -m transit.replay serve --archive feeds.zip --port 8765 --speed 10
+  python3 -m transit.replay bench --archive feeds.zip --stops 300 --duration 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from . import gtfs_realtime_pb2
+from .gtfs_static import HeadsignIndex, RouteIndex
+from .worker import (
+    DataBuffers,
+    FeedHub,
+    PollPolicy,
+    feed_auth,
+    feed_request,
+    get_session_pool,
+    load_all_stops,
+    resolve_feed_url,
+    set_feed_base_url,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+def feed_key(url_or_path: str) -> str:
+    """Last path segment of a feed URL, e.g. 'nyct%2Fgtfs-ace'."""
+    return urlsplit(url_or_path).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+@dataclass(frozen=True)
+class Capture:
+    offset_ms: int
+    latency_ms: int
+    member: str
+
+
+def record(
+    archive_path: str,
+    feed_groups: List[str],
+    duration_s: float,
+    interval_s: float,
+    api_key: str = "",
+    bus_api_key: str = "",
+) -> int:
+    """Poll the given feeds and append every changed response to the archive; returns captures written."""
+    urls = sorted({resolve_feed_url(group) for group in feed_groups})
+    last_hash: Dict[str, str] = {}
+    written = 0
+    start = time.time()
+
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("meta.json", json.dumps({"started_at": start, "feeds": urls}))
+        while time.time() - start < duration_s:
+            cycle_start = time.time()
+            for url in urls:
+                # Same key placement as the live app (Bus Time takes ?key=)
+                request_url, headers = feed_request(url, *feed_auth(url, api_key, bus_api_key))
+                try:
+                    resp, timing = get_session_pool().get(request_url, headers=headers, timeout_s=10.0)
+                    resp.raise_for_status()
+                except Exception as e:
+                    print(f"record: {url} failed: {e}")
+                    continue
+
+                body = resp.content
+                body_hash = hashlib.blake2b(body, digest_size=16).hexdigest()
+                if last_hash.get(url) == body_hash:
+                    continue
+                last_hash[url] = body_hash
+
+                offset_ms = int((time.time() - start) * 1000)
+                latency_ms = int((timing.handshake_s + timing.wait_s + timing.transfer_s) * 1000)
+                zf.writestr(f"{feed_key(url)}/{offset_ms:010d}-{latency_ms:06d}.pb", body)
+                written += 1
+                print(f"record: {feed_key(url)} @{offset_ms / 1000:.1f}s {len(body)} bytes")
+
+            time.sleep(max(0.0, interval_s - (time.time() - cycle_start)))
+    return written
+
+
+class FeedArchive:
+    """Read-only view of a recorded archive, indexed by feed and capture offset."""
+
+    def __init__(self, path: str) -> None:
+        self._zf = zipfile.ZipFile(path, "r")
+        self._lock = threading.Lock()
+        meta = json.loads(self._zf.read("meta.json"))
+        self.started_at = float(meta["started_at"])
+        self.captures: Dict[str, List[Capture]] = {}
+        for name in self._zf.namelist():
+            if not name.endswith(".pb"):
+                continue
+            key, filename = name.rsplit("/", 1)
+            offset, latency = filename[:-3].split("-")
+            self.captures.setdefault(key, []).append(Capture(int(offset), int(latency), name))
+        for captures in self.captures.values():
+            captures.sort(key=lambda c: c.offset_ms)
+        self._offsets = {key: [c.offset_ms for c in captures] for key, captures in self.captures.items()}
+        self.duration_ms = max((c[-1].offset_ms for c in self.captures.values()), default=0)
+
+    def at(self, key: str, offset_ms: int) -> Optional[Capture]:
+        """The capture that was current for a feed at the given recording offset."""
+        offsets = self._offsets.get(key)
+        if not offsets:
+            return None
+        i = bisect.bisect_right(offsets, offset_ms) - 1
+        return self.captures[key][max(i, 0)]
+
+    def read(self, capture: Capture) -> bytes:
+        with self._lock:
+            return self._zf.read(capture.member)
+
+
+def shift_feed_times(body: bytes, shift_s: int) -> bytes:
+    """Move every timestamp in a feed by shift_s so a recording looks current."""
+    msg = gtfs_realtime_pb2.FeedMessage()
+    msg.ParseFromString(body)
+    if msg.header.timestamp:
+        msg.header.timestamp += shift_s
+    for ent in msg.entity:
+        if ent.HasField("vehicle") and ent.vehicle.timestamp:
+            ent.vehicle.timestamp += shift_s
+        if not ent.HasField("trip_update"):
+            continue
+        tu = ent.trip_update
+        if tu.timestamp:
+            tu.timestamp += shift_s
+        for stu in tu.stop_time_update:
+            if stu.HasField("arrival") and stu.arrival.time:
+                stu.arrival.time += shift_s
+            if stu.HasField("departure") and stu.departure.time:
+                stu.departure.time += shift_s
+    return msg.SerializeToString()
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    Serves an archive on the same paths as FEED_URLS. Time runs `speed` times
+    faster than real time and wraps around at the end of the recording.
+    Responses carry an ETag/Last-Modified and honour conditional requests.
+    """
+    daemon_threads = True
+
+    def __init__(
+        self,
+        archive: FeedArchive,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        speed: float = 1.0,
+        shift_times: bool = True,
+        simulate_latency: bool = False,
+    ) -> None:
+        super().__init__((host, port), _ReplayHandler)
+        self.archive = archive
+        self.speed = speed
+        self.shift_times = shift_times
+        self.simulate_latency = simulate_latency
+        self.started_at = time.time()
+        self.requests_served = 0
+        self._bodies: Dict[Tuple[str, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def current(self, key: str) -> Optional[Tuple[Capture, bytes, float]]:
+        """(capture, body, wall time it became current) for a feed right now."""
+        elapsed_ms = int((time.time() - self.started_at) * 1000 * self.speed)
+        loops, offset_ms = divmod(elapsed_ms, max(self.archive.duration_ms, 1))
+        capture = self.archive.at(key, offset_ms)
+        if capture is None:
+            return None
+
+        became_current = self.started_at + (loops * self.archive.duration_ms + capture.offset_ms) / 1000 / self.speed
+        cache_key = (capture.member, loops)
+        with self._lock:
+            body = self._bodies.get(cache_key)
+        if body is None:
+            body = self.archive.read(capture)
+            if self.shift_times:
+                recorded_at = self.archive.started_at + capture.offset_ms / 1000
+                body = shift_feed_times(body, int(became_current - recorded_at))
+            with self._lock:
+                if len(self._bodies) > 64:
+                    self._bodies.clear()
+                self._bodies[cache_key] = body
+        return capture, body, became_current
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True, name="replay-server")
+        thread.start()
+        return thread
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: ReplayServer
+
+    def do_GET(self) -> None:
+        current = self.server.current(feed_key(self.path))
+        if current is None:
+            self.send_error(404, "feed not in archive")
+            return
+        capture, body, became_current = current
+        self.server.requests_served += 1
+
+        if self.server.simulate_latency:
+            time.sleep(capture.latency_ms / 1000 / self.server.speed)
+
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-protobuf")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(became_current, usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def bench(archive_path: str, stop_count: int, duration_s: float, speed: float) -> Dict[str, Dict]:
+    """Replay an archive in-process and subscribe stop_count stops from the recorded feeds to a FeedHub."""
+    archive = FeedArchive(archive_path)
+    server = ReplayServer(archive, port=0, speed=speed)
+    server.serve_in_background()
+    set_feed_base_url(server.base_url)
+
+    stops = load_all_stops(DATA_DIR)
+    # Spread the simulated stops round-robin over the recorded feeds
+    router = RouteIndex.build(DATA_DIR, stops)
+    by_feed: Dict[str, List[str]] = {key: [] for key in archive.captures}
+    for stop_id, stop in stops.items():
+        # Subway platforms and bus stops; parent stations would double up on their platforms
+        if stop.transit_type == "train" and stop_id[-1:] not in ("N", "S"):
+            continue
+        keys = [feed_key(url) for url in router.feed_urls_for_stop(stop_id)]
+        if keys and all(key in by_feed for key in keys):
+            by_feed[keys[0]].append(stop_id)
+    selected: List[str] = []
+    while len(selected) < stop_count and any(by_feed.values()):
+        for ids in by_feed.values():
+            if ids and len(selected) < stop_count:
+                selected.append(ids.pop(0))
+
+    hub = FeedHub(stops=stops, api_key="", policy=PollPolicy(default_s=30.0 / speed, min_s=0.5),
+                  router=router, headsigns=HeadsignIndex.build(DATA_DIR))
+    buffers = {stop_id: DataBuffers() for stop_id in selected}
+    for stop_id, buf in buffers.items():
+        hub.subscribe(stop_id, buf)
+
+    t0 = time.time()
+    hub.start()
+    time.sleep(duration_s)
+    hub.stop()
+    hub.join(timeout=5)
+    server.shutdown()
+    set_feed_base_url(None)
+
+    stats = hub.stats()
+    filled = sum(1 for buf in buffers.values() if buf.updated_at)
+    print(f"bench: {len(selected)} stops over {len(stats)} feeds, {time.time() - t0:.1f}s, "
+          f"{server.requests_served} requests, {filled} stops populated")
+    for url, s in stats.items():
+        print(f"  {feed_key(url)}: fetches={s['fetches']} parses={s['parses']} "
+              f"avoided={s['parses_avoided']} handshake={s['handshake_s'] * 1000:.0f}ms "
+              f"transfer={s['transfer_s'] * 1000:.0f}ms")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record and replay GTFS-RT feeds")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_record = sub.add_parser("record", help="Capture live feed responses into an archive")
+    p_record.add_argument("--out", required=True, help="Archive path (.zip)")
+    p_record.add_argument("--feeds", nargs="+", default=["MAIN", "ACE", "BDFM", "G", "JZ", "NQRW", "L", "SI"])
+    p_record.add_argument("--duration", type=float, default=600.0, help="Seconds to record")
+    p_record.add_argument("--interval", type=float, default=15.0, help="Seconds between polls")
+    p_record.add_argument("--api-key", default=os.environ.get("MTA_API_KEY", ""))
+    p_record.add_argument("--bus-api-key", default=os.environ.get("MTA_BUS_API_KEY", ""),
+                          help="MTA Bus Time key, needed to record the BUS feed")
+
+    p_serve = sub.add_parser("serve", help="Replay an archive over HTTP on the FEED_URLS paths")
+    p_serve.add_argument("--archive", required=True)
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8765)
+    p_serve.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier")
+    p_serve.add_argument("--no-shift", action="store_true", help="Serve recorded timestamps unchanged")
+    p_serve.add_argument("--latency", action="store_true", help="Delay responses by the recorded fetch latency")
+
+    p_bench = sub.add_parser("bench", help="Benchmark FeedHub against an in-process replay server")
+    p_bench.add_argument("--archive", required=True)
+    p_bench.add_argument("--stops", type=int, default=200)
+    p_bench.add_argument("--duration", type=float, default=30.0)
+    p_bench.add_argument("--speed", type=float, default=10.0)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        written = record(args.out, args.feeds, args.duration, args.interval,
+                         api_key=args.api_key, bus_api_key=args.bus_api_key)
+        print(f"record: wrote {written} captures to {args.out}")
+    elif args.command == "serve":
+        server = ReplayServer(
+            FeedArchive(args.archive),
+            host=args.host,
+            port=args.port,
+            speed=args.speed,
+            shift_times=not args.no_shift,
+            simulate_latency=args.latency,
+        )
+        print(f"Replaying {args.archive} on {server.base_url} at {args.speed}x")
+        print(f"Point the app at it with TRAINSIGN_FEED_BASE_URL={server.base_url}"
+              " (and TRAINSIGN_FEED_GROUPS=ACE,BDFM,... to replay only those feed groups)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "bench":
+        bench(args.archive, args.stops, args.duration, args.speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Typo-tolerant search over stop names (and bus stop_desc).
+
+Stops are grouped by their normalized text, which folds a station's N and S
+platforms into one document. The index keeps:
+
+- a sorted vocabulary of tokens, so a token typed so far is answered with a
+  prefix range (bisect) and search works on every keystroke
+- trigram -> token postings, to find near-miss tokens for typos without
+  comparing against the whole vocabulary
+- token -> document postings
+
+Each query token must match every result (exactly, as a prefix, or within a
+small edit distance); results are ranked by how well they matched.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .worker import TrainStop
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Subway names say "St"/"Av", bus stops "ST"/"AV"; let people type either
+_ALIASES = {
+    "street": "st", "avenue": "av", "ave": "av", "road": "rd", "boulevard": "blvd",
+    "place": "pl", "parkway": "pkwy", "square": "sq", "center": "ctr", "saint": "st",
+    "east": "e", "west": "w", "north": "n", "south": "s",
+}
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+TYPO_SCORE = 0.5   # minus a little per edit
+DESC_FACTOR = 0.7  # matches only found in stop_desc count for less than name matches
+
+
+def normalize(text: str) -> List[str]:
+    tokens = _NON_ALNUM.sub(" ", text.lower()).split()
+    return [_ALIASES.get(token, token) for token in tokens]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_edits(token: str) -> int:
+    if len(token) <= 3:
+        return 0
+    return 1 if len(token) <= 6 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, or limit + 1 once it's known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class StopSearchIndex:
+    def __init__(self, stops: Iterable[TrainStop]) -> None:
+        # document = distinct (name, desc) text -> the stops that share it
+        self._doc_stops: List[List[TrainStop]] = []
+        self._doc_names: List[str] = []
+        doc_ids: Dict[Tuple[str, str], int] = {}
+        # token -> {doc: weight}; weight is 1.0 for name tokens, DESC_FACTOR for desc-only
+        postings: Dict[str, Dict[int, float]] = {}
+
+        for stop in stops:
+            name_tokens = normalize(stop.name)
+            desc_tokens = normalize(stop.desc)
+            key = (" ".join(name_tokens), " ".join(desc_tokens))
+            doc = doc_ids.get(key)
+            if doc is None:
+                doc = doc_ids[key] = len(self._doc_stops)
+                self._doc_stops.append([])
+                self._doc_names.append(stop.name)
+                for token in desc_tokens:
+                    postings.setdefault(token, {})[doc] = DESC_FACTOR
+                for token in name_tokens:
+                    postings.setdefault(token, {})[doc] = 1.0
+            self._doc_stops[doc].append(stop)
+
+        self._vocab: List[str] = sorted(postings)
+        self._postings: List[Dict[int, float]] = [postings[token] for token in self._vocab]
+        self._trigram_tokens: Dict[str, List[int]] = {}
+        for token_id, token in enumerate(self._vocab):
+            for gram in _trigrams(token):
+                self._trigram_tokens.setdefault(gram, []).append(token_id)
+
+    def __len__(self) -> int:
+        return len(self._doc_stops)
+
+    def _token_matches(self, query_token: str, allow_prefix: bool) -> Dict[int, float]:
+        """token id -> score for vocabulary tokens matching one query token."""
+        matches: Dict[int, float] = {}
+
+        start = bisect_left(self._vocab, query_token)
+        if start < len(self._vocab) and self._vocab[start] == query_token:
+            matches[start] = EXACT_SCORE
+        if allow_prefix:
+            token_id = start
+            while token_id < len(self._vocab) and self._vocab[token_id].startswith(query_token):
+                matches.setdefault(token_id, PREFIX_SCORE)
+                token_id += 1
+
+        # Only look for typos when the token doesn't match anything as typed
+        limit = _max_edits(query_token)
+        if limit and not matches:
+            grams = _trigrams(query_token)
+            shared: Dict[int, int] = {}
+            for gram in grams:
+                for token_id in self._trigram_tokens.get(gram, ()):
+                    shared[token_id] = shared.get(token_id, 0) + 1
+            # Each edit destroys at most 3 trigrams
+            need = max(1, len(grams) - 3 * limit)
+            for token_id, count in shared.items():
+                if count < need or token_id in matches:
+                    continue
+                token = self._vocab[token_id]
+                if allow_prefix:
+                    # While typing, compare against the start of longer tokens
+                    n = len(query_token)
+                    edits = min(_edit_distance(query_token, token[:m], limit) for m in range(n - limit, n + limit + 1))
+                else:
+                    edits = _edit_distance(query_token, token, limit)
+                if edits <= limit:
+                    matches[token_id] = TYPO_SCORE - 0.1 * edits
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        transit_type: Optional[str] = None,
+    ) -> List[Tuple[float, TrainStop]]:
+        """Up to limit (score, stop) pairs, best first."""
+        tokens = normalize(query)
+        if not tokens or limit <= 0:
+            return []
+
+        scores: Optional[Dict[int, float]] = None
+        for i, token in enumerate(tokens):
+            # The last token may still be being typed
+            token_scores: Dict[int, float] = {}
+            for token_id, score in self._token_matches(token, allow_prefix=i == len(tokens) - 1).items():
+                for doc, weight in self._postings[token_id].items():
+                    if scores is not None and doc not in scores:
+                        continue
+                    value = score * weight
+                    if value > token_scores.get(doc, 0.0):
+                        token_scores[doc] = value
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc: scores[doc] + value for doc, value in token_scores.items()}
+            if not scores:
+                return []
+
+        # Best score first; among equals prefer shorter (more specific) names
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._doc_names[item[0]]), self._doc_names[item[0]]))
+        results: List[Tuple[float, TrainStop]] = []
+        for doc, score in ranked:
+            for stop in self._doc_stops[doc]:
+                if transit_type and stop.transit_type != transit_type:
+                    continue
+                results.append((score / len(tokens), stop))
+                if len(results) >= limit:
+                    return results
+        return results
@@ -0,0 +1,127 @@
+"""
+Grid index over stop coordinates for nearest-stop queries.
+
+The index reads the float coordinate columns of a StopTable and buckets its
+row numbers into fixed-size cells. A query walks rings of cells outward from the query point and stops
+as soon as no unvisited cell can hold anything closer than the k-th match.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .worker import StopRecord, StopTable
+
+EARTH_RADIUS_M = 6371000.0
+# Cell edge in degrees of latitude (~330m); longitude cells are the same size
+# in degrees, so narrower in meters at NYC's latitude
+CELL_DEG = 0.003
+_M_PER_DEG = math.pi * EARTH_RADIUS_M / 180.0
+
+
+class StopGrid:
+    def __init__(self, table: StopTable, cell_deg: float = CELL_DEG) -> None:
+        self.cell_deg = cell_deg
+        self.table = table
+        # Plain-float copies: indexing a numpy array one element at a time is slower than a list
+        self.lats = array("d", table.lat.tolist())
+        self.lons = array("d", table.lon.tolist())
+        self._types = table.codes["transit_type"].tolist()
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._count = 0
+
+        for row, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            if math.isnan(lat) or math.isnan(lon):
+                continue
+            self._count += 1
+            self._cells.setdefault(self._cell(lat, lon), []).append(row)
+
+        cells = list(self._cells)
+        self._bounds = (
+            min(i for i, _ in cells), max(i for i, _ in cells),
+            min(j for _, j in cells), max(j for _, j in cells),
+        ) if cells else (0, 0, 0, 0)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        limit: int = 10,
+        radius_m: Optional[float] = None,
+        transit_type: Optional[str] = None,
+    ) -> List[Tuple[float, StopRecord]]:
+        """Up to limit (distance_m, stop) pairs nearest to lat/lon, closest first."""
+        if limit <= 0 or not self._count:
+            return []
+        type_code = None
+        if transit_type:
+            if transit_type not in self.table.categories["transit_type"]:
+                return []
+            type_code = self.table.categories["transit_type"].index(transit_type)
+
+        # Equirectangular distance; well under 0.1% off at city scale
+        lon_scale = math.cos(math.radians(lat))
+        # Smallest cell dimension in meters bounds how close an unvisited ring can be
+        min_cell_m = self.cell_deg * _M_PER_DEG * min(1.0, lon_scale)
+        ci, cj = self._cell(lat, lon)
+        # Never walk past the occupied cells
+        min_i, max_i, min_j, max_j = self._bounds
+        max_ring = max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+        if radius_m is not None:
+            max_ring = min(max_ring, math.ceil(radius_m / min_cell_m) + 1)
+
+        # Max-heap of the best `limit` so far, as (-distance, row)
+        best: List[Tuple[float, int]] = []
+        # Rings that lie entirely outside the occupied cells can be skipped
+        ring = max(0, min_i - ci, ci - max_i, min_j - cj, cj - max_j)
+        while True:
+            for cell in _ring_cells(ci, cj, ring, self._bounds):
+                for row in self._cells.get(cell, ()):
+                    if type_code is not None and self._types[row] != type_code:
+                        continue
+                    dy = (self.lats[row] - lat) * _M_PER_DEG
+                    dx = (self.lons[row] - lon) * _M_PER_DEG * lon_scale
+                    dist = math.sqrt(dx * dx + dy * dy)
+                    if radius_m is not None and dist > radius_m:
+                        continue
+                    if len(best) < limit:
+                        heapq.heappush(best, (-dist, row))
+                    elif dist < -best[0][0]:
+                        heapq.heapreplace(best, (-dist, row))
+
+            ring += 1
+            # Anything in ring r is at least (r - 1) cells away
+            nearest_unvisited = (ring - 1) * min_cell_m
+            if len(best) == limit and nearest_unvisited > -best[0][0]:
+                break
+            if ring > max_ring:
+                break
+
+        return [(dist, self.table.record(row)) for dist, row in sorted((-neg_dist, row) for neg_dist, row in best)]
+
+
+def _ring_cells(ci: int, cj: int, ring: int, bounds: Tuple[int, int, int, int]):
+    """Cells at Chebyshev distance `ring` from (ci, cj), clipped to bounds."""
+    min_i, max_i, min_j, max_j = bounds
+    if ring == 0:
+        yield (ci, cj)
+        return
+    j_lo, j_hi = max(cj - ring, min_j), min(cj + ring, max_j)
+    for i in (ci - ring, ci + ring):
+        if min_i <= i <= max_i:
+            for j in range(j_lo, j_hi + 1):
+                yield (i, j)
+    i_lo, i_hi = max(ci - ring + 1, min_i), min(ci + ring - 1, max_i)
+    for j in (cj - ring, cj + ring):
+        if min_j <= j <= max_j:
+            for i in range(i_lo, i_hi + 1):
+                yield (i, j)
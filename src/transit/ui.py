@@ -1,6 +1,7 @@
 import os
 from core.matrix import load_matrix, import_matrix
 from transit.worker import DataBuffers, MTAWorker, load_stop_data
+from transit.gtfs_static import load_routes, route_styles
 
 matrix, _, graphics = import_matrix()
 
@@ -20,37 +21,16 @@ YELLOW = graphics.Color(155,155,0)
 BROWN = graphics.Color(59,29,12)
 
 
-def getRouteColor(route):
-    
-    if route=="A" or route=="C" or route=="E":
-        return BLUE
-    
-    if route=="1" or route=="2" or route=="3":
-        return DARK_RED
-    
-    if route=="7X":
-        return DARK_PURPLE
-    
-    if route=="7":
-        return PURPLE
-    
-    if route=="B" or route=="D" or route=="F" or route=="M":
-        return ORANGE
-    
-    if route=="N" or route=="Q" or route=="R" or route=="W":
-        return YELLOW
-    
-    if route=="J" or route=="Z":
-        return BROWN
-    
-    if route=="4" or route=="5" or route=="6":
-        return DARK_GREEN
+# route -> bullet color, from routes.txt (subway and bus), adjusted for the LEDs
+ROUTE_COLORS = {}
+for _routes_txt in ("gtfs_subway/routes.txt", "gtfs_busco/routes.txt"):
+    _path = os.path.join(os.path.dirname(__file__), "data", _routes_txt)
+    if os.path.exists(_path):
+        for _route_id, _style in route_styles(load_routes(_path)).items():
+            ROUTE_COLORS[_route_id] = graphics.Color(*_style.color)
 
-    if route=="L":
-        return GRAY
-    
-    print ("Unknown route color for ", route)
-    return GRAY
+def getRouteColor(route):
+    return ROUTE_COLORS.get(route, GRAY)
 
 def drawCircle(c,  x, y, color):
     # Draw circle with lines
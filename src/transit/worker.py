@@ -16,23 +16,44 @@ Python port of the Go example:
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import os
+import queue
+import socket
+import tempfile
 import threading
 import time
-from dataclasses import dataclass, asdict, field
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field, replace
 from datetime import datetime, timezone
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlencode, urlsplit
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
 
 # pip install gtfs-realtime-bindings
 #from google.transit import gtfs_realtime_pb2  # type: ignore
 #from gtfs_realtime_bindings import gtfs_realtime_pb2
 from . import gtfs_realtime_pb2
 
+try:
+    import numpy as np
+except ImportError:  # the columnar StopTable is optional
+    np = None
+
+if TYPE_CHECKING:
+    from .gtfs_static import HeadsignIndex, RouteIndex
+
 
 MAX_ARRIVALS = 6
 
@@ -70,6 +91,13 @@ FEED_URLS: Dict[str, str] = {
     "SI": "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-si",
     "S": "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-si",
     "H": "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-si",
+    # MTA Bus Time publishes every bus route in one trip updates feed
+    "BUS": "https://gtfsrt.prod.obanyc.com/tripUpdates",
+}
+
+# Feeds that take their API key as a query parameter instead of the x-api-key header
+FEED_KEY_PARAMS: Dict[str, str] = {
+    "BUS": "key",
 }
 
 
@@ -78,6 +106,53 @@ class Arrival:
     route_id: str
     when: datetime
     destination: str = ""
+    direction: str = ""  # "N"/"S", set when a station merges its platforms
+
+
+def stop_direction(stop_id: str) -> str:
+    """"N"/"S" for a subway platform id (e.g. "G14N"), "" otherwise."""
+    suffix = stop_id[-1:]
+    return suffix if suffix in ("N", "S") else ""
+
+
+@dataclass(frozen=True)
+class ArrivalFilter:
+    """
+    Which arrivals a stop shows. Empty fields match everything; destinations
+    are case-insensitive substrings of the destination shown (the headsign,
+    or the trip's last stop name).
+    """
+    routes: FrozenSet[str] = frozenset()
+    directions: FrozenSet[str] = frozenset()  # "N"/"S"
+    destinations: Tuple[str, ...] = ()
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ArrivalFilter":
+        return cls(
+            routes=frozenset(str(r).strip().upper() for r in data.get("routes", []) if str(r).strip()),
+            directions=frozenset(str(d).strip().upper() for d in data.get("directions", []) if str(d).strip()),
+            destinations=tuple(str(d).strip().lower() for d in data.get("destinations", []) if str(d).strip()),
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "routes": sorted(self.routes),
+            "directions": sorted(self.directions),
+            "destinations": list(self.destinations),
+        }
+
+    def __bool__(self) -> bool:
+        return bool(self.routes or self.directions or self.destinations)
+
+    def matches(self, route_id: str, direction: str, destination: str) -> bool:
+        if self.routes and route_id.upper() not in self.routes:
+            return False
+        if self.directions and direction not in self.directions:
+            return False
+        if self.destinations:
+            destination = destination.lower()
+            return any(d in destination for d in self.destinations)
+        return True
 
 
 @dataclass(frozen=True)
@@ -94,6 +169,7 @@ class TrainStatus:
     status: str = ""
     text: str = ""
     color: Color = field(default_factory=lambda: Color(50, 50, 50))
+    direction: str = ""
 
 
 
@@ -107,6 +183,7 @@ class TrainStop:
     location_type: str
     parent_station_id: str
     transit_type: str = "train"  # "train" or "bus"
+    desc: str = ""  # stop_desc; bus stops use it for the cross streets
 
 
 def get_feed_id_from_stop_id(stop_id: str) -> str:
@@ -161,6 +238,29 @@ def resolve_feed_url(feed_group: str) -> str:
     return FEED_URLS[key]
 
 
+_DEFAULT_FEED_URLS: Dict[str, str] = dict(FEED_URLS)
+
+
+def set_feed_base_url(base_url: Optional[str], feed_groups: Optional[List[str]] = None) -> None:
+    """
+    Point FEED_URLS at another host (e.g. a local replay server), keeping each
+    feed's path. Only the given feed groups are changed if any are passed;
+    base_url=None restores the MTA defaults. Call before stops are subscribed.
+    """
+    keys = [k.strip().upper() for k in feed_groups] if feed_groups else list(_DEFAULT_FEED_URLS)
+    unknown = [k for k in keys if k not in _DEFAULT_FEED_URLS]
+    if unknown:
+        raise ValueError(f"unknown feed group(s) {', '.join(unknown)}; expected some of {', '.join(_DEFAULT_FEED_URLS)}")
+    # A group and its line aliases (ACE, A, C, E) share one feed; move them together
+    urls = {_DEFAULT_FEED_URLS[k] for k in keys}
+    for key in [k for k, url in _DEFAULT_FEED_URLS.items() if url in urls]:
+        default = _DEFAULT_FEED_URLS[key]
+        if base_url is None:
+            FEED_URLS[key] = default
+        else:
+            FEED_URLS[key] = base_url.rstrip("/") + urlsplit(default).path
+
+
 def load_stop_data(stops_txt_path: str, transit_type: str = "train") -> Dict[str, TrainStop]:
     path = Path(stops_txt_path)
     if not path.exists():
@@ -178,6 +278,7 @@ def load_stop_data(stops_txt_path: str, transit_type: str = "train") -> Dict[str
             # Train format: stop_id, stop_name, stop_lat, stop_lon, location_type, parent_station
             # Bus format: stop_id, stop_name, stop_desc, stop_lat, stop_lon
             name = row.get("stop_name", "").strip().strip('"')
+            desc = row.get("stop_desc", "").strip().strip('"')
             lat = row.get("stop_lat", "").strip()
             lon = row.get("stop_lon", "").strip()
             location_type = row.get("location_type", "").strip()
@@ -197,6 +298,7 @@ def load_stop_data(stops_txt_path: str, transit_type: str = "train") -> Dict[str
                 location_type=location_type,
                 parent_station_id=parent_station_id,
                 transit_type=transit_type,
+                desc=desc,
             )
 
     return stops
@@ -221,79 +323,831 @@ def load_all_stops(data_dir: str) -> Dict[str, TrainStop]:
     return all_stops
 
 
-def fetch_arrivals(feed_url: str, stop_id: str, api_key: str, timeout_s: float = 10.0) -> List[Arrival]:
-    headers = {"x-api-key": api_key} if api_key else {}
-    resp = requests.get(feed_url, headers=headers, timeout=timeout_s)
-    resp.raise_for_status()
+class StopRecord:
+    """Read-only, TrainStop-shaped view of one StopTable row (lat/lon are floats)."""
+    __slots__ = ("_table", "row")
 
-    msg = gtfs_realtime_pb2.FeedMessage()
-    msg.ParseFromString(resp.content)
+    def __init__(self, table: "StopTable", row: int) -> None:
+        self._table = table
+        self.row = row
+
+    @property
+    def stop_id(self) -> str:
+        return self._table.stop_ids[self.row]
+
+    @property
+    def name(self) -> str:
+        return self._table.names[self.row]
+
+    @property
+    def desc(self) -> str:
+        return self._table.descs[self.row]
+
+    @property
+    def parent_station_id(self) -> str:
+        return self._table.parent_station_ids[self.row]
+
+    @property
+    def lat(self) -> float:
+        return float(self._table.lat[self.row])
+
+    @property
+    def lon(self) -> float:
+        return float(self._table.lon[self.row])
+
+    @property
+    def line(self) -> str:
+        return self._table.category("line", self.row)
+
+    @property
+    def transit_type(self) -> str:
+        return self._table.category("transit_type", self.row)
 
-    now = datetime.now(timezone.utc)
-    arrivals: List[Arrival] = []
+    @property
+    def location_type(self) -> str:
+        return self._table.category("location_type", self.row)
 
-    for ent in msg.entity:
-        if not ent.HasField("trip_update"):
-            continue
-        tu = ent.trip_update
-        route_id = tu.trip.route_id
+    def to_stop(self) -> TrainStop:
+        return TrainStop(
+            stop_id=self.stop_id,
+            line=self.line,
+            name=self.name,
+            lat=str(self.lat),
+            lon=str(self.lon),
+            location_type=self.location_type,
+            parent_station_id=self.parent_station_id,
+            transit_type=self.transit_type,
+            desc=self.desc,
+        )
 
-        # Extract destination/headsign from GTFS-RT
-        destination = ""
+    def __repr__(self) -> str:
+        return f"StopRecord({self.stop_id!r}, {self.name!r})"
+
+
+def _float_or_nan(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+class StopTable:
+    """
+    Columnar copy of the stops for vectorized work (requires numpy).
+
+    Coordinates are float64 arrays, low-cardinality fields (line, transit_type,
+    location_type) are small int codes into per-column category tuples, and
+    stop ids map to row numbers. Rows come back as StopRecord views. The web
+    API builds its stop JSON from the columns and StopGrid indexes the rows.
+    """
+    CATEGORICAL = ("line", "transit_type", "location_type")
+
+    def __init__(self, stops: Dict[str, TrainStop]) -> None:
+        if np is None:
+            raise RuntimeError("StopTable requires numpy")
+        self.stop_ids: List[str] = list(stops)
+        self.index: Dict[str, int] = {stop_id: row for row, stop_id in enumerate(self.stop_ids)}
+        rows = list(stops.values())
+        self.names: List[str] = [stop.name for stop in rows]
+        self.descs: List[str] = [stop.desc for stop in rows]
+        self.parent_station_ids: List[str] = [stop.parent_station_id for stop in rows]
+        # Unparseable coordinates become NaN rather than failing the whole table
+        self.lat = np.array([_float_or_nan(stop.lat) for stop in rows], dtype=np.float64)
+        self.lon = np.array([_float_or_nan(stop.lon) for stop in rows], dtype=np.float64)
+
+        self.categories: Dict[str, Tuple[str, ...]] = {}
+        self.codes: Dict[str, "np.ndarray"] = {}
+        for column in self.CATEGORICAL:
+            values = [getattr(stop, column) for stop in rows]
+            categories = tuple(sorted(set(values)))
+            lookup = {value: code for code, value in enumerate(categories)}
+            self.categories[column] = categories
+            self.codes[column] = np.array([lookup[value] for value in values], dtype=np.int16)
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def __len__(self) -> int:
+        return len(self.stop_ids)
+
+    def __contains__(self, stop_id: object) -> bool:
+        return stop_id in self.index
+
+    def category(self, column: str, row: int) -> str:
+        return self.categories[column][self.codes[column][row]]
+
+    def column(self, column: str) -> List[str]:
+        """A categorical column decoded for every row."""
+        categories = self.categories[column]
+        return [categories[code] for code in self.codes[column].tolist()]
+
+    def get(self, stop_id: str) -> Optional[StopRecord]:
+        row = self.index.get(stop_id)
+        return StopRecord(self, row) if row is not None else None
+
+    def record(self, row: int) -> StopRecord:
+        return StopRecord(self, row)
+
+    def mask(self, **equals: str) -> "np.ndarray":
+        """Boolean row mask for categorical equality, e.g. mask(transit_type="bus")."""
+        selected = np.ones(len(self), dtype=bool)
+        for column, value in equals.items():
+            try:
+                code = self.categories[column].index(value)
+            except ValueError:
+                return np.zeros(len(self), dtype=bool)
+            selected &= self.codes[column] == code
+        return selected
+
+    def distances_m(self, lat: float, lon: float) -> "np.ndarray":
+        """Equirectangular distance in meters from lat/lon to every row."""
+        m_per_deg = 111194.93
+        dy = (self.lat - lat) * m_per_deg
+        dx = (self.lon - lon) * (m_per_deg * np.cos(np.radians(lat)))
+        return np.hypot(dx, dy)
+
+    def nearest(self, lat: float, lon: float, k: int = 10, mask: Optional["np.ndarray"] = None) -> List[Tuple[float, StopRecord]]:
+        distances = self.distances_m(lat, lon)
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if len(rows) > k:
+            rows = rows[np.argpartition(distances[rows], k)[:k]]
+        rows = rows[np.argsort(distances[rows], kind="stable")]
+        return [(float(distances[row]), StopRecord(self, int(row))) for row in rows]
+
+
+class _DNSCache:
+    """Small TTL cache in front of getaddrinfo so each poll doesn't re-resolve the MTA host."""
+    def __init__(self, ttl_s: float = 300.0) -> None:
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int], Tuple[float, str]] = {}
+
+    def resolve(self, host: str, port: int) -> str:
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        address = infos[0][4][0]
+        with self._lock:
+            self._entries[key] = (now + self.ttl_s, address)
+        return address
+
+    def forget(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+@dataclass
+class RequestTiming:
+    """Where the time went for a single feed request."""
+    dns_s: float = 0.0
+    handshake_s: float = 0.0   # TCP connect + TLS; 0 when a kept-alive connection was reused
+    wait_s: float = 0.0        # request sent -> response headers, minus handshake
+    transfer_s: float = 0.0    # response body download
+    bytes: int = 0
+
+    @property
+    def reused(self) -> bool:
+        return self.handshake_s == 0.0
+
+
+# Filled in by the timed connection classes on the thread that makes the request
+_timing_local = threading.local()
+_dns_cache = _DNSCache()
+
+
+def _current_timing() -> Optional[RequestTiming]:
+    return getattr(_timing_local, "timing", None)
+
+
+class _TimedConnectionMixin:
+    """Resolves through the DNS cache and records connect/TLS time for the current request."""
+    def _new_conn(self):  # type: ignore[override]
+        host, port = self._dns_host, self.port
+        t0 = time.perf_counter()
+        self._dns_host = _dns_cache.resolve(host, port)
+        timing = _current_timing()
+        if timing is not None:
+            timing.dns_s += time.perf_counter() - t0
         try:
-            # Try trip_properties.trip_headsign (GTFS-RT 2.0+)
-            if tu.HasField("trip_properties") and tu.trip_properties.trip_headsign:
-                destination = tu.trip_properties.trip_headsign
+            return super()._new_conn()
         except Exception:
+            _dns_cache.forget(host, port)
+            raise
+        finally:
+            self._dns_host = host
+
+    def connect(self) -> None:
+        timing = _current_timing()
+        dns_before = timing.dns_s if timing is not None else 0.0
+        t0 = time.perf_counter()
+        super().connect()
+        if timing is not None:
+            # connect() resolves via _new_conn(), which already booked its DNS time
+            elapsed = time.perf_counter() - t0
+            timing.handshake_s += max(0.0, elapsed - (timing.dns_s - dns_before))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, urllib3.connection.HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class SessionPool:
+    """
+    Thread-safe pool of keep-alive requests sessions shared by all feed polling.
+
+    Sessions are checked out per request, so concurrent callers never share one,
+    and each keeps its TCP/TLS connections to the feed host alive between polls.
+    """
+    def __init__(self, size: int = 4, connections_per_host: int = 2, dns_ttl_s: float = 300.0) -> None:
+        self.size = size
+        self.connections_per_host = connections_per_host
+        _dns_cache.ttl_s = dns_ttl_s
+        self._idle: "queue.LifoQueue[requests.Session]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = _TimedHTTPAdapter(
+            pool_connections=self.connections_per_host,
+            pool_maxsize=self.connections_per_host,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({"Accept-Encoding": "gzip", "Connection": "keep-alive"})
+        return session
+
+    def _checkout(self) -> requests.Session:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
             pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._new_session()
+        return self._idle.get()
+
+    def get(self, url: str, headers: Dict[str, str], timeout_s: float) -> Tuple[requests.Response, RequestTiming]:
+        """GET url through a pooled session; the body is fully read before returning."""
+        session = self._checkout()
+        timing = RequestTiming()
+        _timing_local.timing = timing
+        try:
+            t0 = time.perf_counter()
+            resp = session.get(url, headers=headers, timeout=timeout_s, stream=True)
+            t1 = time.perf_counter()
+            content = resp.content
+            t2 = time.perf_counter()
+        finally:
+            _timing_local.timing = None
+            self._idle.put(session)
+
+        timing.wait_s = max(0.0, (t1 - t0) - timing.handshake_s - timing.dns_s)
+        timing.transfer_s = t2 - t1
+        timing.bytes = len(content)
+        return resp, timing
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
 
-        # Fallback: use last stop_id in the trip
-        if not destination and tu.stop_time_update:
-            destination = tu.stop_time_update[-1].stop_id
 
-        for stu in tu.stop_time_update:
-            if stu.stop_id != stop_id:
-                continue
+_session_pool: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
 
-            epoch = 0
-            if stu.HasField("departure") and stu.departure.time:
-                epoch = int(stu.departure.time)
-            elif stu.HasField("arrival") and stu.arrival.time:
-                epoch = int(stu.arrival.time)
-            if not epoch:
-                continue
 
-            t = datetime.fromtimestamp(epoch, tz=timezone.utc)
-            if t < now:
+def get_session_pool() -> SessionPool:
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            _session_pool = SessionPool()
+        return _session_pool
+
+
+def configure_session_pool(size: int = 4, connections_per_host: int = 2, dns_ttl_s: float = 300.0) -> SessionPool:
+    """Replace the shared session pool, e.g. to tune its size at startup."""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is not None:
+            _session_pool.close()
+        _session_pool = SessionPool(size=size, connections_per_host=connections_per_host, dns_ttl_s=dns_ttl_s)
+        return _session_pool
+
+
+@dataclass
+class FeedCoverage:
+    """Stop ids a feed's non-empty snapshots have carried since `since` (see FeedHub._prune_candidates)."""
+    since: float
+    updated_at: float
+    stop_ids: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class FeedState:
+    """Per-feed validators and counters used to skip snapshots that haven't changed."""
+    etag: str = ""
+    last_modified: str = ""
+    body_hash: str = ""
+    header_timestamp: int = 0
+    fetches: int = 0
+    not_modified: int = 0         # server answered 304 to the conditional request
+    unchanged_body: int = 0       # body bytes identical to the last snapshot
+    unchanged_timestamp: int = 0  # FeedHeader.timestamp identical to the last snapshot
+    parses: int = 0
+    reused_connections: int = 0
+    handshake_s: float = 0.0      # cumulative, across all fetches
+    transfer_s: float = 0.0       # cumulative, across all fetches
+    last_timing: RequestTiming = field(default_factory=RequestTiming)
+    cadence_s: float = 0.0        # smoothed gap between distinct FeedHeader.timestamps
+    error_rate: float = 0.0       # smoothed fraction of failed polls
+    next_arrival_epoch: int = 0   # soonest arrival across the feed's subscribed stops
+    interval_s: float = 0.0       # delay chosen for the next poll
+    idle: bool = False            # nobody is displaying the feed's stops; polled at PollPolicy.idle_s
+    fetched_at: float = 0.0       # last time the feed was confirmed current (new snapshot or unchanged)
+    next_poll_at: float = 0.0     # when the next poll is due; 0 while paused
+    polls_moved: int = 0          # polls brought forward or pushed back so a stop was fresh when shown
+
+    @property
+    def parses_avoided(self) -> int:
+        return self.not_modified + self.unchanged_body + self.unchanged_timestamp
+
+    def to_dict(self) -> Dict:
+        d = asdict(self)
+        d["parses_avoided"] = self.parses_avoided
+        return d
+
+    def record_timing(self, timing: RequestTiming) -> None:
+        self.last_timing = timing
+        self.handshake_s += timing.handshake_s
+        self.transfer_s += timing.transfer_s
+        if timing.reused:
+            self.reused_connections += 1
+
+    def record_header_timestamp(self, header_timestamp: int) -> None:
+        if self.header_timestamp and header_timestamp > self.header_timestamp:
+            gap = float(header_timestamp - self.header_timestamp)
+            self.cadence_s = gap if not self.cadence_s else 0.7 * self.cadence_s + 0.3 * gap
+        self.header_timestamp = header_timestamp
+
+    def record_result(self, ok: bool) -> None:
+        self.error_rate = 0.8 * self.error_rate + (0.0 if ok else 0.2)
+
+
+@dataclass
+class PollPolicy:
+    """
+    Chooses how long to wait before polling a feed again.
+
+    Starts from the feed's observed publish cadence, polls sooner when a
+    subscribed train is about to arrive and later when the next one is far off,
+    stretches overnight and while the feed keeps failing, and always stays
+    within [min_s, max_s].
+    """
+    default_s: float = 30.0
+    min_s: float = 10.0
+    max_s: float = 180.0
+    imminent_s: float = 180.0     # next arrival closer than this -> poll faster
+    distant_s: float = 900.0      # next arrival further than this -> poll slower
+    night_start_hour: int = 1
+    night_end_hour: int = 5
+    night_factor: float = 3.0
+    error_factor: float = 4.0     # multiplier at a 100% error rate
+    idle_s: float = 900.0         # keep-warm interval for feeds nobody is displaying; 0 pauses them
+    prefetch_lead_s: float = 2.0  # how long before a stop is shown to refresh it (see FeedHub.ensure_fresh)
+    max_age_s: float = 10.0       # oldest feed data a stop may be shown with (see FeedHub.ensure_fresh)
+    prune_after_s: float = 600.0  # a guessed feed must go this long without a stop before it is dropped for it
+    reprobe_s: float = 3600.0     # dropped feeds are polled again after this, in case the route came back
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PollPolicy":
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+    def is_night(self, hour: int) -> bool:
+        if self.night_start_hour <= self.night_end_hour:
+            return self.night_start_hour <= hour < self.night_end_hour
+        return hour >= self.night_start_hour or hour < self.night_end_hour
+
+    def next_interval(self, state: FeedState, now: Optional[datetime] = None) -> float:
+        now = now or datetime.now().astimezone()
+        # No point polling faster than the feed publishes
+        interval = max(self.default_s, state.cadence_s)
+
+        if state.next_arrival_epoch:
+            until = state.next_arrival_epoch - now.timestamp()
+            if 0 < until <= self.imminent_s:
+                # Land at least one more refresh before the train arrives
+                interval = max(self.min_s, state.cadence_s, min(interval, until / 2))
+            elif until >= self.distant_s:
+                interval = max(interval, until / 4)
+
+        if self.is_night(now.hour):
+            interval *= self.night_factor
+        interval *= 1.0 + state.error_rate * (self.error_factor - 1.0)
+        return max(self.min_s, min(self.max_s, interval))
+
+
+def feed_auth(feed_url: str, api_key: str, bus_api_key: str = "") -> Tuple[str, Optional[str]]:
+    """(API key, query parameter or None for the x-api-key header) to fetch a feed with."""
+    for group, key_param in FEED_KEY_PARAMS.items():
+        if FEED_URLS.get(group) == feed_url:
+            return (bus_api_key if group == "BUS" else api_key), key_param
+    return api_key, None
+
+
+def feed_request(feed_url: str, api_key: str, key_param: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """URL and headers carrying the API key, as x-api-key or as the key_param query parameter."""
+    if not api_key:
+        return feed_url, {}
+    if key_param:
+        return feed_url + ("&" if "?" in feed_url else "?") + urlencode({key_param: api_key}), {}
+    return feed_url, {"x-api-key": api_key}
+
+
+def download_feed(
+    feed_url: str,
+    api_key: str,
+    timeout_s: float = 10.0,
+    state: Optional[FeedState] = None,
+    key_param: Optional[str] = None,
+) -> Optional[bytes]:
+    """
+    Download a feed body. When a FeedState is given, the request is made
+    conditional on its ETag/Last-Modified and None is returned on 304.
+    The API key is sent as x-api-key, or as the key_param query parameter.
+    """
+    feed_url, headers = feed_request(feed_url, api_key, key_param)
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+    resp, timing = get_session_pool().get(feed_url, headers=headers, timeout_s=timeout_s)
+    if state is not None:
+        state.fetches += 1
+        state.record_timing(timing)
+        if resp.status_code == 304:
+            state.not_modified += 1
+            return None
+    resp.raise_for_status()
+
+    if state is not None:
+        state.etag = resp.headers.get("ETag", "")
+        state.last_modified = resp.headers.get("Last-Modified", "")
+    return resp.content
+
+
+def parse_feed(content: bytes) -> "gtfs_realtime_pb2.FeedMessage":
+    msg = gtfs_realtime_pb2.FeedMessage()
+    msg.ParseFromString(content)
+    return msg
+
+
+def peek_header_timestamp(content: bytes) -> int:
+    """
+    Read FeedHeader.timestamp without parsing the whole message.
+
+    The header is field 1 of FeedMessage and is serialized first, so only its
+    length-delimited bytes need decoding. Returns 0 if it can't be found.
+    """
+    if not content or content[0] != 0x0A:  # field 1, wire type 2
+        return 0
+    length = 0
+    shift = 0
+    pos = 1
+    while pos < len(content):
+        b = content[pos]
+        pos += 1
+        length |= (b & 0x7F) << shift
+        if not b & 0x80:
+            break
+        shift += 7
+    else:
+        return 0
+
+    header = gtfs_realtime_pb2.FeedHeader()
+    try:
+        header.ParseFromString(content[pos:pos + length])
+    except Exception:
+        return 0
+    return int(header.timestamp)
+
+
+def fetch_feed_if_changed(
+    feed_url: str,
+    api_key: str,
+    state: FeedState,
+    timeout_s: float = 10.0,
+    key_param: Optional[str] = None,
+) -> Optional["gtfs_realtime_pb2.FeedMessage"]:
+    """
+    Fetch and parse a feed, or return None if the snapshot is the same one
+    already seen (304, identical body, or identical FeedHeader.timestamp).
+    """
+    content = download_feed(feed_url, api_key, timeout_s=timeout_s, state=state, key_param=key_param)
+    if content is None:
+        return None
+
+    body_hash = hashlib.blake2b(content, digest_size=16).hexdigest()
+    if body_hash == state.body_hash:
+        state.unchanged_body += 1
+        return None
+
+    header_timestamp = peek_header_timestamp(content)
+    if header_timestamp and header_timestamp == state.header_timestamp:
+        state.body_hash = body_hash
+        state.unchanged_timestamp += 1
+        return None
+
+    msg = parse_feed(content)
+    state.parses += 1
+    state.body_hash = body_hash
+    state.record_header_timestamp(int(msg.header.timestamp))
+    return msg
+
+
+def _sorted_arrivals(heap: List[Tuple[int, int, str, str]]) -> List[Arrival]:
+    heap.sort(key=lambda item: (-item[0], item[1]))
+    return [
+        Arrival(
+            route_id=route_id,
+            when=datetime.fromtimestamp(-neg_epoch, tz=timezone.utc),
+            destination=destination,
+        )
+        for neg_epoch, _, route_id, destination in heap
+    ]
+
+
+def _keep_soonest(heaps: Dict, key, item: Tuple[int, int, str, str], k: int) -> None:
+    """Add item to the bounded max-heap at key, evicting the latest once it holds k."""
+    heap = heaps.get(key)
+    if heap is None:
+        heaps[key] = [item]
+    elif len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item[0] > heap[0][0]:
+        heapq.heapreplace(heap, item)
+
+
+class ArrivalIndex:
+    """
+    stop_id -> soonest upcoming arrivals, built in a single pass over a FeedMessage.
+
+    Each stop keeps a bounded max-heap of its k earliest departures while the feed
+    is walked, so any number of stops can be answered afterwards without rescanning.
+    """
+    def __init__(
+        self,
+        by_stop: Dict[str, List[Arrival]],
+        filtered: Optional[Dict[Tuple[str, ArrivalFilter], List[Arrival]]] = None,
+        stop_ids: Optional[FrozenSet[str]] = None,
+    ) -> None:
+        self._by_stop = by_stop
+        # (stop_id, filter) -> soonest matching arrivals, for stops indexed with filters
+        self._filtered = filtered or {}
+        # Every stop the feed carried, whatever views it was indexed for (or whether any arrival matched)
+        self._stop_ids = stop_ids if stop_ids is not None else frozenset(by_stop)
+
+    @classmethod
+    def from_feed(
+        cls,
+        msg: "gtfs_realtime_pb2.FeedMessage",
+        k: int = MAX_ARRIVALS,
+        now: Optional[datetime] = None,
+        headsigns: Optional["HeadsignIndex"] = None,
+        filters: Optional[Dict[str, Tuple[Optional[ArrivalFilter], ...]]] = None,
+        stops: Optional[Dict[str, "TrainStop"]] = None,
+    ) -> "ArrivalIndex":
+        """
+        filters maps a stop_id to the views to index it for; None in the
+        tuple is the unfiltered view, and stops not listed get only that.
+        Filters are applied during the pass, so a filtered view's k slots
+        hold only arrivals it will show. With stops, a trip without a
+        headsign is labelled with its last stop's name rather than its id,
+        so destination filters match what the board shows.
+        """
+        now_epoch = int((now or datetime.now(timezone.utc)).timestamp())
+        # stop_id -> heap of (-epoch, seq, route_id, destination); the root is the
+        # latest of the k kept so far, so it is the one to evict.
+        heaps: Dict[str, List[Tuple[int, int, str, str]]] = {}
+        # (stop_id, filter) -> the same, for filtered views
+        filtered_heaps: Dict[Tuple[str, ArrivalFilter], List[Tuple[int, int, str, str]]] = {}
+        seen: Set[str] = set()
+        seq = 0
+
+        for ent in msg.entity:
+            if not ent.HasField("trip_update"):
                 continue
+            tu = ent.trip_update
+            route_id = tu.trip.route_id
+
+            # Extract destination/headsign from GTFS-RT
+            destination = ""
+            try:
+                # Try trip_properties.trip_headsign (GTFS-RT 2.0+)
+                if tu.HasField("trip_properties") and tu.trip_properties.trip_headsign:
+                    destination = tu.trip_properties.trip_headsign
+            except Exception:
+                pass
+
+            # Fallback: the scheduled headsign for the trip's pattern
+            if not destination and headsigns is not None:
+                destination = headsigns.resolve(tu.trip.trip_id)
+
+            # Last resort: the trip's last stop, by name if it is known
+            if not destination and tu.stop_time_update:
+                destination = tu.stop_time_update[-1].stop_id
+                last_stop = stops.get(destination) if stops else None
+                if last_stop is not None:
+                    destination = last_stop.name
+
+            for stu in tu.stop_time_update:
+                seen.add(stu.stop_id)
+                epoch = 0
+                if stu.HasField("departure") and stu.departure.time:
+                    epoch = int(stu.departure.time)
+                elif stu.HasField("arrival") and stu.arrival.time:
+                    epoch = int(stu.arrival.time)
+                if epoch < now_epoch:
+                    continue
+
+                seq += 1
+                views = filters.get(stu.stop_id) if filters else None
+                if views is not None:
+                    direction = stop_direction(stu.stop_id)
+                    for view in views:
+                        if view is not None and view.matches(route_id, direction, destination):
+                            _keep_soonest(filtered_heaps, (stu.stop_id, view), (-epoch, seq, route_id, destination), k)
+                    if None not in views:
+                        continue
+
+                heap = heaps.get(stu.stop_id)
+                if heap is None:
+                    heaps[stu.stop_id] = [(-epoch, seq, route_id, destination)]
+                elif len(heap) < k:
+                    heapq.heappush(heap, (-epoch, seq, route_id, destination))
+                elif epoch < -heap[0][0]:
+                    heapq.heapreplace(heap, (-epoch, seq, route_id, destination))
+
+        by_stop = {stop_id: _sorted_arrivals(heap) for stop_id, heap in heaps.items()}
+        filtered = {key: _sorted_arrivals(heap) for key, heap in filtered_heaps.items()}
+        return cls(by_stop, filtered, frozenset(seen))
+
+    def get(self, stop_id: str, stop_filter: Optional[ArrivalFilter] = None) -> List[Arrival]:
+        if stop_filter is None:
+            return self._by_stop.get(stop_id, [])
+        view = self._filtered.get((stop_id, stop_filter))
+        if view is not None:
+            return view
+        # Not indexed with this filter (or nothing matched): filter the unfiltered arrivals
+        direction = stop_direction(stop_id)
+        return [a for a in self._by_stop.get(stop_id, []) if stop_filter.matches(a.route_id, direction, a.destination)]
+
+    def stop_ids(self) -> List[str]:
+        """Every stop the snapshot carried, including ones with only filtered views or no upcoming arrivals."""
+        return list(self._stop_ids)
+
+    def __contains__(self, stop_id: object) -> bool:
+        return stop_id in self._stop_ids
+
+    def __len__(self) -> int:
+        return len(self._stop_ids)
+
+
+def arrivals_for_stop(
+    msg: "gtfs_realtime_pb2.FeedMessage",
+    stop_id: str,
+    stop_filter: Optional[ArrivalFilter] = None,
+    stops: Optional[Dict[str, "TrainStop"]] = None,
+) -> List[Arrival]:
+    if not stop_filter:
+        return ArrivalIndex.from_feed(msg, stops=stops).get(stop_id)
+    return ArrivalIndex.from_feed(msg, filters={stop_id: (stop_filter,)}, stops=stops).get(stop_id, stop_filter)
+
+
+def fetch_arrivals(
+    feed_url: str,
+    stop_id: str,
+    api_key: str,
+    timeout_s: float = 10.0,
+    stop_filter: Optional[ArrivalFilter] = None,
+    stops: Optional[Dict[str, "TrainStop"]] = None,
+) -> List[Arrival]:
+    msg = parse_feed(download_feed(feed_url, api_key, timeout_s=timeout_s))
+    return arrivals_for_stop(msg, stop_id, stop_filter, stops=stops)
+
+
+@dataclass(frozen=True)
+class ArrivalSlot:
+    """A buffered arrival: route, departure epoch (UTC seconds) and resolved destination."""
+    route_id: str
+    epoch: int
+    text: str = ""
+    direction: str = ""
 
-            arrivals.append(Arrival(route_id=route_id, when=t, destination=destination))
 
-    arrivals.sort(key=lambda a: a.when)
-    return arrivals[:MAX_ARRIVALS]
+def format_minutes(epoch: int, now: float) -> str:
+    mins = int((epoch - now) // 60)
+    if mins < 0:
+        mins = 0
+    return f"{mins:3d}m"
+
+
+@dataclass(frozen=True)
+class BoardSnapshot:
+    """An immutable published state of a DataBuffers; version increases with every publish."""
+    version: int = 0
+    slots: Tuple[ArrivalSlot, ...] = ()
+    # True while showing arrivals restored from the on-disk cache rather than a live fetch
+    stale: bool = False
+    updated_at: float = 0.0
 
 
 class DataBuffers:
     """
     Thread-safe buffers like your Go globals.
+
+    Arrivals are stored as epochs; countdown strings are computed whenever the
+    buffers are read, so they stay current between feed polls.
+
+    Writers publish a new immutable BoardSnapshot by swapping one attribute,
+    so readers never take a lock: they read `board` and get a consistent
+    version, slots and stale flag. The serialized rows are cached against
+    the board and reused until a countdown ticks over, so repeated reads
+    (every frame, every /api/arrivals request) don't rebuild them.
     """
+    ROWS = 3
+
     def __init__(self) -> None:
-        self._lock = threading.Lock()
-        self.lines_buffer: List[str] = ["", "", ""]
-        self.data_buffer: List[TrainStatus] = [TrainStatus(), TrainStatus(), TrainStatus()]
+        # Only serializes writers, so versions stay monotonic
+        self._write_lock = threading.Lock()
+        self._board = BoardSnapshot()
+        # (board, valid_from, valid_until, lines, rows) of the last snapshot() built
+        self._view: Optional[Tuple[BoardSnapshot, float, float, List[str], List[Dict]]] = None
 
-    def set_from_arrivals(self, arrivals: List[Arrival], stops: Optional[Dict[str, "TrainStop"]] = None) -> None:
-        now = datetime.now(timezone.utc)
-        new_lines = ["", "", ""]
-        new_data = [TrainStatus(), TrainStatus(), TrainStatus()]
+    @property
+    def board(self) -> BoardSnapshot:
+        return self._board
 
-        for i, a in enumerate(arrivals[:3]):
-            mins = int((a.when - now).total_seconds() // 60)
-            if mins < 0:
-                mins = 0
-            status = f"{mins:3d}m"
-            new_lines[i] = status
+    @property
+    def version(self) -> int:
+        return self._board.version
 
+    @property
+    def stale(self) -> bool:
+        return self._board.stale
+
+    @property
+    def updated_at(self) -> float:
+        return self._board.updated_at
+
+    def changed_since(self, version: int) -> bool:
+        """True if arrivals were published after `version` (countdown ticks don't count; see next_change)."""
+        return self._board.version != version
+
+    def set_from_arrivals(
+        self,
+        arrivals: List[Arrival],
+        stops: Optional[Dict[str, "TrainStop"]] = None,
+        stale: bool = False,
+        updated_at: Optional[float] = None,
+    ) -> None:
+        new_slots: List[ArrivalSlot] = []
+        for a in arrivals[:MAX_ARRIVALS]:
             # Get destination text - try to resolve stop_id to station name
             dest_text = a.destination
             if dest_text and stops:
@@ -303,77 +1157,901 @@ class DataBuffers:
             if not dest_text:
                 dest_text = ""
 
-            new_data[i] = TrainStatus(
-                text=dest_text,
-                route_id=a.route_id,
+            new_slots.append(ArrivalSlot(
+                route_id=a.route_id, epoch=int(a.when.timestamp()), text=dest_text, direction=a.direction,
+            ))
+
+        with self._write_lock:
+            self._board = BoardSnapshot(
+                version=self._board.version + 1,
+                slots=tuple(new_slots),
+                stale=stale,
+                updated_at=time.time() if updated_at is None else updated_at,
+            )
+
+    def _visible(self, now: float, board: Optional[BoardSnapshot] = None) -> List[ArrivalSlot]:
+        slots = (board or self._board).slots
+        upcoming = [slot for slot in slots if slot.epoch >= now]
+        directions = sorted({slot.direction for slot in upcoming})
+        if len(directions) <= 1:
+            return upcoming[:self.ROWS]
+
+        # Station board: the next train each way, then the soonest of the rest,
+        # shown grouped by direction
+        chosen = [next(i for i, slot in enumerate(upcoming) if slot.direction == d) for d in directions]
+        for i in range(len(upcoming)):
+            if len(chosen) >= self.ROWS:
+                break
+            if i not in chosen:
+                chosen.append(i)
+        rows = [upcoming[i] for i in chosen[:self.ROWS]]
+        return sorted(rows, key=lambda slot: (slot.direction, slot.epoch))
+
+    def snapshot(self, now: Optional[float] = None, board: Optional[BoardSnapshot] = None) -> Tuple[List[str], List[Dict]]:
+        """
+        Countdown lines and serialized rows for the current board, or for a
+        board already read from `board` so other fields can be taken from
+        the same snapshot. The lists are shared between readers until the
+        board or a countdown changes, so treat them as read-only.
+        """
+        now = time.time() if now is None else now
+        board = self._board if board is None else board
+        view = self._view
+        if view is not None and view[0] is board and view[1] <= now < view[2]:
+            return view[3], view[4]
+
+        visible = self._visible(now, board)
+        lb = [""] * self.ROWS
+        rows = [TrainStatus() for _ in range(self.ROWS)]
+        for i, slot in enumerate(visible):
+            status = format_minutes(slot.epoch, now)
+            lb[i] = status
+            rows[i] = TrainStatus(
+                text=slot.text,
+                route_id=slot.route_id,
                 status=status,
-                time=a.when.astimezone().strftime("%I:%M %p").lstrip("0"),
+                time=datetime.fromtimestamp(slot.epoch).strftime("%I:%M %p").lstrip("0"),
                 color=Color(50, 50, 50),
+                direction=slot.direction,
             )
+        data = [asdict(ts) for ts in rows]
+        valid_until = self._next_change(now, visible)
+        # A racing reader may build the same view; either copy is correct
+        self._view = (board, now, float("inf") if valid_until is None else valid_until, lb, data)
+        return lb, data
+
+    def next_change(self, now: Optional[float] = None) -> Optional[float]:
+        """Epoch at which the next visible countdown ticks down (or a train departs)."""
+        now = time.time() if now is None else now
+        return self._next_change(now, self._visible(now))
+
+    @staticmethod
+    def _next_change(now: float, visible: List[ArrivalSlot]) -> Optional[float]:
+        soonest: Optional[float] = None
+        for slot in visible:
+            mins = (slot.epoch - now) // 60
+            # The countdown reads `mins` until exactly mins*60s remain
+            at = slot.epoch - mins * 60
+            if soonest is None or at < soonest:
+                soonest = at
+        return soonest
+
+
+class ArrivalCache:
+    """
+    Last known arrivals per stop, persisted to disk so a restart can show
+    something (marked stale) before the first live fetch completes.
 
-        with self._lock:
-            self.lines_buffer = new_lines
-            self.data_buffer = new_data
+    Writes go to a temp file that is renamed over the cache, so a crash or
+    power cut never leaves a half-written file behind.
+    """
+    VERSION = 1
 
-    def snapshot(self) -> Tuple[List[str], List[Dict]]:
-        with self._lock:
-            lb = list(self.lines_buffer)
-            db = [asdict(ts) for ts in self.data_buffer]
-        return lb, db
+    def __init__(self, path: str, min_write_interval_s: float = 60.0) -> None:
+        self.path = Path(path)
+        self.min_write_interval_s = min_write_interval_s
+        self._lock = threading.Lock()
+        # stop_id -> (saved_at, [[route_id, epoch, destination(, direction)], ...])
+        self._entries: Dict[str, Tuple[float, List[List]]] = {}
+        self._dirty = False
+        self._last_write = 0.0
+        # Held across a whole flush, so two fetch threads never write the file at once
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable arrival cache {self.path}: {e}")
+            return
+        if data.get("version") != self.VERSION:
+            return
+        for stop_id, entry in data.get("stops", {}).items():
+            self._entries[stop_id] = (float(entry["saved_at"]), entry["arrivals"])
 
+    def get(self, stop_id: str) -> Optional[Tuple[float, List[Arrival]]]:
+        """Return (saved_at, arrivals) for a stop, or None if it was never cached."""
+        with self._lock:
+            entry = self._entries.get(stop_id)
+        if entry is None:
+            return None
+        saved_at, rows = entry
+        # Rows are [route_id, epoch, destination] with an optional trailing direction
+        arrivals = [
+            Arrival(
+                route_id=row[0],
+                when=datetime.fromtimestamp(row[1], tz=timezone.utc),
+                destination=row[2],
+                direction=row[3] if len(row) > 3 else "",
+            )
+            for row in rows
+        ]
+        return saved_at, arrivals
 
-class MTAWorker(threading.Thread):
+    def update(self, arrivals_by_stop: Dict[str, List[Arrival]]) -> None:
+        now = time.time()
+        with self._lock:
+            for stop_id, arrivals in arrivals_by_stop.items():
+                rows = [
+                    [a.route_id, int(a.when.timestamp()), a.destination] + ([a.direction] if a.direction else [])
+                    for a in arrivals
+                ]
+                self._entries[stop_id] = (now, rows)
+            self._dirty = True
+            due = now - self._last_write >= self.min_write_interval_s
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = {
+                    "version": self.VERSION,
+                    "stops": {
+                        stop_id: {"saved_at": saved_at, "arrivals": rows}
+                        for stop_id, (saved_at, rows) in self._entries.items()
+                    },
+                }
+                self._dirty = False
+                self._last_write = time.time()
+
+            tmp_path: Optional[str] = None
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Failed to write arrival cache {self.path}: {e}")
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+
+class MTAWorker:
     """
-    Background worker thread: fetches arrivals for configured stops and populates buffers.
+    Keeps buffers populated for configured stops.
+
+    Kept for callers that think in per-stop workers; it no longer owns a thread.
+    Starting one subscribes its stop to the process-wide FeedHub, so the thread
+    count stays constant however many workers are created.
     """
     def __init__(
         self,
         *,
         stops: Dict[str, TrainStop],
         configured_stop_ids: List[str],
-        refresh_s: float,
         api_key: str,
         buffers: DataBuffers,
         name: str,
+        refresh_s: Optional[float] = None,
     ) -> None:
-        super().__init__(daemon=True)
         self._stops = stops
         self._configured_stop_ids = configured_stop_ids
         self._refresh_s = refresh_s
         self._api_key = api_key
         self._buffers = buffers
-        self._stop_evt = threading.Event()
+        self._hub: Optional[FeedHub] = None
         self.name = name
 
-    def stop(self) -> None:
-        self._stop_evt.set()
-
-    def run(self) -> None:
+    def start(self) -> None:
         # Minimal behavior match: original loop uses the first stop (even if multiple were parsed)
-        # You can extend to rotate stops if you want.
-        
         first_stop_id = self._configured_stop_ids[0]
         print("RUN worker: " + self.name + " " + first_stop_id)
-        stop = self._stops.get(first_stop_id)
-        if not stop:
+        policy = PollPolicy(default_s=self._refresh_s) if self._refresh_s else None
+        self._hub = shared_feed_hub(stops=self._stops, api_key=self._api_key, policy=policy)
+        try:
+            print(", ".join(self._hub.subscribe(first_stop_id, self._buffers)))
+        except ValueError:
             print("NO STOPS!")
+
+    def stop(self) -> None:
+        if self._hub is not None:
+            self._hub.unsubscribe(self._configured_stop_ids[0])
+
+
+class FeedHub(threading.Thread):
+    """
+    Owns all feed polling on a single asyncio event-loop thread.
+
+    Each distinct feed URL gets one task that downloads and parses the feed
+    once per cycle, then fans the arrivals out to every subscribed stop's
+    buffers. A stop served by several feeds (per the router) is fed the merge
+    of their latest indexes. A parent station (per platforms) is one
+    subscription fed from all of its platforms, tagged by direction. Each feed's cycle length comes from the
+    PollPolicy. Snapshots that haven't changed since the last cycle are
+    neither parsed nor pushed to the buffers. Blocking HTTP and protobuf work
+    runs on a small fixed executor, so thread count doesn't depend on the
+    number of stops.
+
+    Consumers (the display rotation, UI clients, API callers) declare which
+    stops they are showing with set_demand. Once any demand has been
+    declared, feeds none of whose stops are wanted drop to the policy's
+    idle_s keep-warm cadence (or pause), and are refreshed as soon as one
+    of their stops is wanted again.
+    """
+    def __init__(
+        self,
+        *,
+        stops: Dict[str, TrainStop],
+        api_key: str,
+        policy: Optional[PollPolicy] = None,
+        cache: Optional[ArrivalCache] = None,
+        router: Optional["RouteIndex"] = None,
+        headsigns: Optional["HeadsignIndex"] = None,
+        platforms: Optional[Dict[str, Tuple[str, ...]]] = None,
+        bus_api_key: str = "",
+        filters: Optional[Dict[str, ArrivalFilter]] = None,
+        timeout_s: float = 10.0,
+        retry_base_s: float = 2.0,
+        max_concurrency: int = 4,
+        name: str = "feed-hub",
+    ) -> None:
+        super().__init__(daemon=True)
+        self._stops = stops
+        self._router = router
+        self._headsigns = headsigns
+        # parent station -> platform stop ids
+        self._platforms = platforms or {}
+        # subscribed stop/station id -> arrivals it shows
+        self._filters = {stop_id: f for stop_id, f in (filters or {}).items() if f}
+        self._policy = policy or PollPolicy()
+        self._cache = cache
+        self._api_key = api_key
+        self._bus_api_key = bus_api_key
+        self._timeout_s = timeout_s
+        self._retry_base_s = retry_base_s
+        self._max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        # feed_url -> {stop_id: buffers}
+        self._subscriptions: Dict[str, Dict[str, DataBuffers]] = {}
+        # stop_id -> feed URLs it is served from
+        self._stop_feeds: Dict[str, List[str]] = {}
+        # stop_id -> feed URLs the router gave it, before any were pruned
+        self._routed_feeds: Dict[str, List[str]] = {}
+        # stop_id -> routed feeds not yet seen to carry it (only when routing is a guess: no router, or RouteIndex.exact is False)
+        self._candidates: Dict[str, Set[str]] = {}
+        # feed_url -> stop ids its snapshots carried over the current window; kept after the feed stops being polled
+        self._feed_coverage: Dict[str, FeedCoverage] = {}
+        # stop_id -> {feed_url: when it was dropped as not carrying the stop}, to be probed again later
+        self._pruned: Dict[str, Dict[str, float]] = {}
+        self._states: Dict[str, FeedState] = {}
+        self._indexes: Dict[str, ArrivalIndex] = {}
+        # Event-loop state; only touched from the loop thread once running
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+        self._wakes: Dict[str, asyncio.Event] = {}
+        # Feeds whose next_poll_at was moved; their wake means "re-read the deadline", not "poll now"
+        self._moved: Set[str] = set()
+        # Fetches still running on the executor, including ones that outlived their poll's timeout
+        self._fetches: Dict[str, "asyncio.Future[None]"] = {}
+        self._stopped: Optional[asyncio.Event] = None
+        self._stop_requested = False
+        # consumer -> (stop ids it is showing, expiry epoch or None); None until anyone declares demand
+        self._demand: Optional[Dict[str, Tuple[FrozenSet[str], Optional[float]]]] = None
+        self.name = name
+
+    def feed_urls_for_stop(self, stop_id: str) -> List[str]:
+        stop = self._stops.get(stop_id)
+        if not stop:
+            raise ValueError(f"unknown stop {stop_id!r}")
+        if self._router is None:
+            if stop.transit_type != "train":
+                return [resolve_feed_url(stop.line)]
+            # No routing table: the trunk-line guess, pruned like a RouteIndex built from it
+            from .gtfs_static import trunk_feed_groups
+            groups = trunk_feed_groups(stop_id) or (stop.line,)
+            return list(dict.fromkeys(resolve_feed_url(group) for group in groups))
+        feed_urls = self._router.feed_urls_for_stop(stop_id)
+        if not feed_urls:
+            raise ValueError(f"no realtime feed serves stop {stop_id!r}")
+        return feed_urls
+
+    def subscribe(self, stop_id: str, buffers: DataBuffers) -> List[str]:
+        """Register buffers for a stop; returns the feed URLs it will be served from."""
+        feed_urls = self.feed_urls_for_stop(stop_id)
+        with self._lock:
+            self._stop_feeds[stop_id] = list(feed_urls)
+            self._routed_feeds[stop_id] = feed_urls
+            if len(feed_urls) > 1 and (self._router is None or not self._router.exact):
+                feed_urls = self._known_carriers(stop_id, feed_urls)
+                self._stop_feeds[stop_id] = list(feed_urls)
+                if len(feed_urls) > 1:
+                    self._candidates[stop_id] = set(feed_urls)
+            for feed_url in feed_urls:
+                self._subscriptions.setdefault(feed_url, {})[stop_id] = buffers
+            missing = [url for url in feed_urls if url not in self._indexes]
+            # Feeds polled long enough can rule themselves out right away
+            now = time.time()
+            emptied = [url for url in feed_urls if url in self._indexes and self._prune_candidates(url, None, now)]
+            feed_urls = list(self._stop_feeds[stop_id])
+            reindex = []
+            if stop_id in self._filters:
+                # Their snapshots weren't indexed with this stop's filter
+                reindex = [url for url in feed_urls if url in self._indexes]
+                for feed_url in reindex:
+                    self._forget_validators(feed_url)
+            loop = self._loop
+
+        if len(missing) < len(feed_urls):
+            # Some feeds are already being polled; serve the stop from their last snapshots
+            buffers.set_from_arrivals(self._merged_arrivals(stop_id), stops=self._stops)
+        else:
+            # Show the last known arrivals (marked stale) until the first fetch lands
+            self._restore_from_cache(stop_id, buffers)
+
+        if loop is not None:
+            for feed_url in missing + reindex:
+                # Starts the feed's task, or wakes it so the new stop doesn't wait a full cycle
+                loop.call_soon_threadsafe(self._ensure_task, feed_url)
+            for feed_url in emptied:
+                loop.call_soon_threadsafe(self._cancel_task, feed_url)
+        return feed_urls
+
+    def _known_carriers(self, stop_id: str, feed_urls: List[str]) -> List[str]:
+        """Candidate feeds minus those already seen not to carry the stop (at least one is kept). Call with the lock held."""
+        now = time.time()
+        kept = [url for url in feed_urls if not self._rules_out(url, stop_id, now)]
+        return kept or feed_urls
+
+    def _rules_out(self, feed_url: str, stop_id: str, now: float) -> bool:
+        """
+        Whether the feed has been seen not to carry the stop: its snapshots
+        span at least PollPolicy.prune_after_s, are recent, and none had it.
+        Call with the lock held.
+        """
+        coverage = self._feed_coverage.get(feed_url)
+        if coverage is None or now - coverage.updated_at >= self._policy.reprobe_s:
+            return False
+        if coverage.updated_at - coverage.since < self._policy.prune_after_s:
+            return False
+        return coverage.stop_ids.isdisjoint(self._indexed_stop_ids(stop_id))
+
+    def _prune_candidates(self, feed_url: str, index: Optional["ArrivalIndex"], now: float) -> bool:
+        """
+        Settle candidate feeds against what a feed has carried, adding index
+        (a new snapshot) to that first. Subscribers it carries are confirmed;
+        those it has gone PollPolicy.prune_after_s without stop polling it
+        (keeping at least one feed each) until _reprobe brings it back.
+        Returns True if the feed has no subscribers left. Call with the lock held.
+        """
+        if index is not None and len(index):
+            # An empty snapshot (outage, no service) says nothing about which stops the feed carries
+            coverage = self._feed_coverage.get(feed_url)
+            if coverage is None or now - coverage.since >= self._policy.reprobe_s:
+                # Start a new window, so routes that stopped or started running are noticed
+                self._feed_coverage[feed_url] = FeedCoverage(since=now, updated_at=now, stop_ids=set(index.stop_ids()))
+            else:
+                coverage.stop_ids.update(index.stop_ids())
+                coverage.updated_at = now
+        coverage = self._feed_coverage.get(feed_url)
+        if coverage is None:
+            return False
+        subscribers = self._subscriptions.get(feed_url, {})
+        for stop_id in list(subscribers):
+            candidates = self._candidates.get(stop_id)
+            if not candidates or feed_url not in candidates:
+                continue
+            carried = not coverage.stop_ids.isdisjoint(self._indexed_stop_ids(stop_id))
+            feeds = self._stop_feeds[stop_id]
+            if carried or len(feeds) > 1 and self._rules_out(feed_url, stop_id, now):
+                candidates.discard(feed_url)
+                if not candidates:
+                    del self._candidates[stop_id]
+            if not carried and feed_url not in candidates and len(feeds) > 1:
+                feeds.remove(feed_url)
+                del subscribers[stop_id]
+                self._pruned.setdefault(stop_id, {})[feed_url] = now
+                print(f"Stop {stop_id} is not in {feed_url}; no longer polling it for this stop")
+        if subscribers:
+            return False
+        self._subscriptions.pop(feed_url, None)
+        self._indexes.pop(feed_url, None)
+        self._states.pop(feed_url, None)
+        return True
+
+    def _reprobe(self, stop_ids: Iterable[str], now: float) -> List[str]:
+        """
+        Put feeds dropped for these stops more than PollPolicy.reprobe_s ago
+        back as candidates; returns the ones that need a task started.
+        Call with the lock held.
+        """
+        started = []
+        for stop_id in stop_ids:
+            pruned = self._pruned.get(stop_id)
+            feeds = self._stop_feeds.get(stop_id)
+            if not pruned or not feeds:
+                continue
+            buffers = self._subscriptions[feeds[0]][stop_id]
+            for feed_url, pruned_at in list(pruned.items()):
+                if now - pruned_at < self._policy.reprobe_s:
+                    continue
+                del pruned[feed_url]
+                feeds.append(feed_url)
+                self._candidates.setdefault(stop_id, set()).add(feed_url)
+                subscribers = self._subscriptions.setdefault(feed_url, {})
+                if not subscribers:
+                    started.append(feed_url)
+                subscribers[stop_id] = buffers
+            if not pruned:
+                del self._pruned[stop_id]
+        return started
+
+    def _indexed_stop_ids(self, stop_id: str) -> Tuple[str, ...]:
+        """Stop ids to read from the arrival indexes: a station's platforms, or the stop itself."""
+        return self._platforms.get(stop_id) or (stop_id,)
+
+    def _merged_arrivals(self, stop_id: str, feed_urls: Optional[List[str]] = None) -> List[Arrival]:
+        """Soonest arrivals for a stop across the latest index of every feed serving it."""
+        with self._lock:
+            if feed_urls is None:
+                feed_urls = self._stop_feeds.get(stop_id, [])
+            indexes = [self._indexes[url] for url in feed_urls if url in self._indexes]
+            stop_filter = self._filters.get(stop_id)
+        platforms = self._platforms.get(stop_id)
+        if not platforms:
+            per_index = [index.get(stop_id, stop_filter) for index in indexes]
+            if len(per_index) == 1:
+                return per_index[0]
+            merged = heapq.merge(*per_index, key=lambda a: a.when)
+            return list(itertools.islice(merged, MAX_ARRIVALS))
+
+        # A station: an equal share of the buffer per platform, so one direction can't crowd out the other
+        share = max(1, MAX_ARRIVALS // len(platforms))
+        per_platform = []
+        for platform_id in platforms:
+            direction = stop_direction(platform_id)
+            if stop_filter is not None and stop_filter.directions and direction not in stop_filter.directions:
+                continue
+            merged = heapq.merge(*(index.get(platform_id, stop_filter) for index in indexes), key=lambda a: a.when)
+            per_platform.append([replace(a, direction=direction) for a in itertools.islice(merged, share)])
+        return list(heapq.merge(*per_platform, key=lambda a: a.when))
+
+    def _index_filters(self, stop_ids: Iterable[str]) -> Dict[str, Tuple[Optional[ArrivalFilter], ...]]:
+        """
+        Views to index each stop id for (see ArrivalIndex.from_feed): one per
+        distinct filter among the subscribers it serves, plus the unfiltered
+        view if any of them is unfiltered. Call with the lock held.
+        """
+        views: Dict[str, Set[Optional[ArrivalFilter]]] = {}
+        for stop_id in stop_ids:
+            stop_filter = self._filters.get(stop_id)
+            for indexed_id in self._indexed_stop_ids(stop_id):
+                views.setdefault(indexed_id, set()).add(stop_filter)
+        return {indexed_id: tuple(wanted) for indexed_id, wanted in views.items() if wanted != {None}}
+
+    def set_filters(self, filters: Dict[str, ArrivalFilter]) -> None:
+        """Replace the per-stop filters; feeds of stops whose filter changed are re-indexed right away."""
+        filters = {stop_id: f for stop_id, f in filters.items() if f}
+        with self._lock:
+            changed = {stop_id for stop_id in set(filters) | set(self._filters)
+                       if filters.get(stop_id) != self._filters.get(stop_id)}
+            self._filters = filters
+            feed_urls = {url for stop_id in changed for url in self._stop_feeds.get(stop_id, ())}
+            for feed_url in feed_urls:
+                self._forget_validators(feed_url)
+            loop = self._loop
+        if loop is not None:
+            for feed_url in feed_urls:
+                loop.call_soon_threadsafe(self._ensure_task, feed_url)
+
+    def _forget_validators(self, feed_url: str) -> None:
+        """Make the feed's next fetch be parsed even if the snapshot is unchanged. Call with the lock held."""
+        state = self._states.get(feed_url)
+        if state is not None:
+            state.etag = state.last_modified = state.body_hash = ""
+            state.header_timestamp = 0
+
+    def peek_arrivals(self, stop_id: str) -> Optional[List[Arrival]]:
+        """
+        Arrivals for any stop or station from the snapshots already held for
+        subscribed feeds, without fetching anything. None if none of the
+        feeds serving it is currently being polled.
+        """
+        try:
+            feed_urls = self.feed_urls_for_stop(stop_id)
+        except ValueError:
+            return None
+        with self._lock:
+            if not any(url in self._indexes for url in feed_urls):
+                return None
+        return self._merged_arrivals(stop_id, feed_urls)
+
+    def set_demand(self, consumer: str, stop_ids: Iterable[str], ttl_s: Optional[float] = None) -> None:
+        """
+        Declare the stops a consumer is showing, replacing its previous set.
+        With ttl_s the demand lapses unless renewed (for clients that poll).
+        Idle feeds serving a newly wanted stop are refreshed right away.
+        """
+        wanted = frozenset(stop_ids)
+        now = time.time()
+        with self._lock:
+            if self._demand is None:
+                self._demand = {}
+            if wanted:
+                self._demand[consumer] = (wanted, now + ttl_s if ttl_s is not None else None)
+            else:
+                self._demand.pop(consumer, None)
+            woken = [url for url, state in self._states.items() if state.idle and self._feed_wanted(url, now)]
+            for feed_url in woken:
+                self._states[feed_url].idle = False
+            loop = self._loop
+        if loop is not None:
+            for feed_url in woken:
+                loop.call_soon_threadsafe(self._ensure_task, feed_url)
+
+    def clear_demand(self, consumer: str) -> None:
+        self.set_demand(consumer, ())
+
+    def ensure_fresh(self, stop_id: str, show_at: float, max_age_s: Optional[float] = None) -> None:
+        """
+        Make sure a stop's feeds will have been fetched within max_age_s
+        (default PollPolicy.max_age_s) of show_at. A feed whose next regular
+        poll won't land in that window has the poll moved to
+        PollPolicy.prefetch_lead_s before show_at rather than gaining an
+        extra one, and its cycle continues from there. The trade-off: a stop
+        that comes round more often than the polling interval pulls its
+        feeds' polls forward on every pass, so they are polled up to once
+        per max(rotation period, max_age_s) instead of once per interval.
+        """
+        lead_s = self._policy.prefetch_lead_s
+        if max_age_s is None:
+            max_age_s = self._policy.max_age_s
+        max_age = max(max_age_s, lead_s)
+        now = time.time()
+        moved: List[str] = []
+        with self._lock:
+            loop = self._loop
+            for feed_url in self._stop_feeds.get(stop_id, ()):
+                state = self._states.get(feed_url)
+                if state is None or not state.fetched_at:
+                    # Its first fetch is still on the way
+                    continue
+                oldest_ok = show_at - max_age
+                poll_at = max(now, show_at - lead_s)
+                if state.fetched_at >= oldest_ok or oldest_ok <= state.next_poll_at <= poll_at:
+                    continue
+                state.next_poll_at = poll_at
+                state.polls_moved += 1
+                moved.append(feed_url)
+        if loop is not None:
+            for feed_url in moved:
+                loop.call_soon_threadsafe(self._reschedule, feed_url)
+
+    def _reschedule(self, feed_url: str) -> None:
+        """Have a feed's task re-read next_poll_at; unlike _ensure_task, doesn't poll now."""
+        wake = self._wakes.get(feed_url)
+        if wake is not None:
+            self._moved.add(feed_url)
+            wake.set()
+
+    def _feed_wanted(self, feed_url: str, now: float) -> bool:
+        """Whether any consumer is showing a stop served by the feed. Call with the lock held."""
+        if self._demand is None:
+            # Nobody tracks demand (CLI, replay): every subscribed feed is wanted
+            return True
+        subscribers = self._subscriptions.get(feed_url, {})
+        for consumer, (stop_ids, expires_at) in list(self._demand.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._demand[consumer]
+            elif not stop_ids.isdisjoint(subscribers):
+                return True
+        return False
+
+    def _restore_from_cache(self, stop_id: str, buffers: DataBuffers) -> None:
+        if self._cache is None:
+            return
+        cached = self._cache.get(stop_id)
+        if cached is None:
             return
+        saved_at, arrivals = cached
+        buffers.set_from_arrivals(arrivals, stops=self._stops, stale=True, updated_at=saved_at)
 
-        feed_group = stop.line
-        feed_url = resolve_feed_url(feed_group)
-        print(feed_url)
-        while not self._stop_evt.is_set():
+    def unsubscribe(self, stop_id: str) -> None:
+        with self._lock:
+            loop = self._loop
+            self._stop_feeds.pop(stop_id, None)
+            self._routed_feeds.pop(stop_id, None)
+            self._candidates.pop(stop_id, None)
+            self._pruned.pop(stop_id, None)
+            for feed_url, subscribers in list(self._subscriptions.items()):
+                subscribers.pop(stop_id, None)
+                if not subscribers:
+                    del self._subscriptions[feed_url]
+                    self._indexes.pop(feed_url, None)
+                    self._states.pop(feed_url, None)
+                    if loop is not None:
+                        loop.call_soon_threadsafe(self._cancel_task, feed_url)
+
+    def replace_static(
+        self,
+        *,
+        stops: Dict[str, TrainStop],
+        router: Optional["RouteIndex"] = None,
+        headsigns: Optional["HeadsignIndex"] = None,
+        platforms: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ) -> List[str]:
+        """
+        Swap in new static data (e.g. after a GTFS import) while polling keeps
+        running. Subscribed stops whose feeds changed move to their new feeds;
+        stops that no longer exist or have no feed are dropped and returned.
+        """
+        with self._lock:
+            self._stops = stops
+            self._router = router
+            self._headsigns = headsigns
+            self._platforms = platforms or {}
+            subscribed: Dict[str, DataBuffers] = {}
+            for subscribers in self._subscriptions.values():
+                subscribed.update(subscribers)
+            current_feeds = {stop_id: list(urls) for stop_id, urls in self._routed_feeds.items()}
+
+        dropped: List[str] = []
+        for stop_id, buffers in subscribed.items():
             try:
-                arrivals = fetch_arrivals(feed_url, stop.stop_id, api_key=self._api_key)
-                self._buffers.set_from_arrivals(arrivals, stops=self._stops)
+                feed_urls = self.feed_urls_for_stop(stop_id)
+            except ValueError as e:
+                print(f"Dropping stop {stop_id} after static data reload: {e}")
+                self.unsubscribe(stop_id)
+                dropped.append(stop_id)
+                continue
+            if feed_urls != current_feeds.get(stop_id):
+                self.unsubscribe(stop_id)
+                self.subscribe(stop_id, buffers)
+        return dropped
 
-                print("Setting arrivals for " + self.name)
-            except Exception:
-                # On error, keep prior buffer; could also clear or write an error sentinel.
-                pass
+    def stats(self) -> Dict[str, Dict]:
+        """Per-feed fetch counters, including how many parses were skipped."""
+        with self._lock:
+            return {url: state.to_dict() for url, state in self._states.items()}
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop_requested = True
+            loop = self._loop
+        if loop is not None and self._stopped is not None:
+            loop.call_soon_threadsafe(self._stopped.set)
+
+    def _feed_auth(self, feed_url: str) -> Tuple[str, Optional[str]]:
+        """(API key, query parameter or None for the header) to fetch a feed with."""
+        return feed_auth(feed_url, self._api_key, self._bus_api_key)
+
+    def refresh_feed(self, feed_url: str) -> bool:
+        """
+        Fetch one feed and update its subscribers (blocking).
+        Returns False if the snapshot was unchanged; raises on fetch errors.
+        """
+        with self._lock:
+            if feed_url not in self._subscriptions:
+                return False
+            subscribers = dict(self._subscriptions[feed_url])
+            state = self._states.setdefault(feed_url, FeedState())
+            filters = self._index_filters(subscribers)
+
+        api_key, key_param = self._feed_auth(feed_url)
+        msg = fetch_feed_if_changed(feed_url, api_key, state, timeout_s=self._timeout_s, key_param=key_param)
+        state.fetched_at = time.time()
+        if msg is None:
+            return False
+
+        index = ArrivalIndex.from_feed(msg, headsigns=self._headsigns, filters=filters, stops=self._stops)
+        with self._lock:
+            emptied = False
+            now = time.time()
+            reprobed = self._reprobe(subscribers, now) if self._pruned else []
+            if feed_url in self._subscriptions:
+                self._indexes[feed_url] = index
+                emptied = self._prune_candidates(feed_url, index, now)
+            loop = self._loop
+        if loop is not None:
+            if emptied:
+                loop.call_soon_threadsafe(self._cancel_task, feed_url)
+            for reprobed_url in reprobed:
+                loop.call_soon_threadsafe(self._ensure_task, reprobed_url)
+        next_arrival: Optional[datetime] = None
+        updated: Dict[str, List[Arrival]] = {}
+        for stop_id, buffers in subscribers.items():
+            arrivals = self._merged_arrivals(stop_id)
+            buffers.set_from_arrivals(arrivals, stops=self._stops)
+            updated[stop_id] = arrivals
+            stop_filter = self._filters.get(stop_id)
+            for indexed_id in self._indexed_stop_ids(stop_id):
+                own = index.get(indexed_id, stop_filter)
+                if own and (next_arrival is None or own[0].when < next_arrival):
+                    next_arrival = own[0].when
+        state.next_arrival_epoch = int(next_arrival.timestamp()) if next_arrival else 0
+        if self._cache is not None:
+            self._cache.update(updated)
+        print(f"Updated {len(subscribers)} stop(s) from {feed_url}")
+        return True
+
+    def poll_once(self) -> None:
+        """Fetch every subscribed feed once, synchronously, on the calling thread."""
+        with self._lock:
+            feed_urls = list(self._subscriptions.keys())
+        for feed_url in feed_urls:
+            try:
+                self.refresh_feed(feed_url)
+            except Exception as e:
+                print(f"Feed fetch failed for {feed_url}: {e}")
 
-            self._stop_evt.wait(self._refresh_s)
+    def run(self) -> None:
+        asyncio.run(self._main())
 
+    async def _main(self) -> None:
+        self._stopped = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=self._max_concurrency, thread_name_prefix="feed-fetch")
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            feed_urls = list(self._subscriptions.keys())
+            if self._stop_requested:
+                self._stopped.set()
+        for feed_url in feed_urls:
+            self._ensure_task(feed_url)
+
+        try:
+            await self._stopped.wait()
+        finally:
+            with self._lock:
+                self._loop = None
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            self._executor.shutdown(wait=False)
+            if self._cache is not None:
+                self._cache.flush()
+
+    def _ensure_task(self, feed_url: str) -> None:
+        task = self._tasks.get(feed_url)
+        if task is not None and not task.done():
+            self._moved.discard(feed_url)
+            self._wakes[feed_url].set()
+            return
+        self._wakes[feed_url] = asyncio.Event()
+        self._tasks[feed_url] = asyncio.get_running_loop().create_task(self._poll_feed(feed_url))
+
+    def _cancel_task(self, feed_url: str) -> None:
+        with self._lock:
+            if feed_url in self._subscriptions:
+                # Re-subscribed before the cancel ran
+                return
+        task = self._tasks.pop(feed_url, None)
+        self._wakes.pop(feed_url, None)
+        self._moved.discard(feed_url)
+        if task is not None:
+            task.cancel()
+
+    def _next_interval(self, feed_url: str, ok: bool, failures: int = 0) -> Optional[float]:
+        """
+        Delay before the next poll; None to wait until the feed is wanted again.
+        After failures, wanted feeds retry with exponential backoff.
+        """
+        with self._lock:
+            state = self._states.get(feed_url)
+            if state is None:
+                return self._policy.default_s
+            state.record_result(ok)
+            state.interval_s = self._policy.next_interval(state)
+            now = time.time()
+            state.idle = not self._feed_wanted(feed_url, now)
+            if state.idle:
+                if self._policy.idle_s <= 0:
+                    state.next_poll_at = 0.0
+                    return None
+                state.interval_s = max(state.interval_s, self._policy.idle_s)
+            elif failures:
+                state.interval_s = min(state.interval_s, self._retry_base_s * 2 ** (failures - 1))
+            state.next_poll_at = now + state.interval_s
+            return state.interval_s
+
+    async def _poll_feed(self, feed_url: str) -> None:
+        loop = asyncio.get_running_loop()
+        wake = self._wakes[feed_url]
+        failures = 0
+        while True:
+            wake.clear()
+            try:
+                # The request has its own timeout; this guards against a hung parse or socket.
+                # Timing out can't stop the worker thread, so a fetch still running from an
+                # earlier poll stands in for this one rather than racing a second refresh_feed
+                fetch = self._fetches.get(feed_url)
+                if fetch is None:
+                    fetch = loop.run_in_executor(self._executor, self.refresh_feed, feed_url)
+                    self._fetches[feed_url] = fetch
+                    fetch.add_done_callback(functools.partial(self._fetch_done, feed_url))
+                await asyncio.wait_for(asyncio.shield(fetch), timeout=self._timeout_s * 1.5)
+                failures = 0
+                delay: Optional[float] = self._next_interval(feed_url, ok=True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # On error, keep prior buffers and retry with exponential backoff
+                failures += 1
+                delay = self._next_interval(feed_url, ok=False, failures=failures)
+                retry = "when wanted" if delay is None else f"in {delay:.0f}s"
+                print(f"Feed fetch failed for {feed_url} (attempt {failures}, retry {retry}): {e!r}")
+
+            await self._wait_for_poll(feed_url, wake, delay)
+
+    def _fetch_done(self, feed_url: str, fetch: "asyncio.Future[None]") -> None:
+        if self._fetches.get(feed_url) is fetch:
+            del self._fetches[feed_url]
+
+    async def _wait_for_poll(self, feed_url: str, wake: asyncio.Event, delay: Optional[float]) -> None:
+        """Sleep until the next poll is due or an immediate refresh is asked for."""
+        while True:
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                return
+            if feed_url not in self._moved:
+                return
+            # ensure_fresh moved the poll: sleep until its new time instead
+            self._moved.discard(feed_url)
+            wake.clear()
+            with self._lock:
+                state = self._states.get(feed_url)
+                if state is None:
+                    return
+                poll_at = state.next_poll_at
+            delay = max(0.0, poll_at - time.time()) if poll_at else None
+
+
+_shared_hub: Optional[FeedHub] = None
+_shared_hub_lock = threading.Lock()
+
+
+def shared_feed_hub(
+    *,
+    stops: Dict[str, TrainStop],
+    api_key: str,
+    policy: Optional[PollPolicy] = None,
+    cache: Optional[ArrivalCache] = None,
+    router: Optional["RouteIndex"] = None,
+    headsigns: Optional["HeadsignIndex"] = None,
+    platforms: Optional[Dict[str, Tuple[str, ...]]] = None,
+    bus_api_key: str = "",
+    filters: Optional[Dict[str, ArrivalFilter]] = None,
+) -> FeedHub:
+    """Return the process-wide FeedHub, creating and starting it on first use."""
+    global _shared_hub
+    with _shared_hub_lock:
+        if _shared_hub is None or not _shared_hub.is_alive():
+            _shared_hub = FeedHub(
+                stops=stops, api_key=api_key, policy=policy, cache=cache, router=router, headsigns=headsigns,
+                platforms=platforms, bus_api_key=bus_api_key, filters=filters,
+            )
+            _shared_hub.start()
+        return _shared_hub
 
 
 def parse_stop_ids(arg: str) -> List[str]:
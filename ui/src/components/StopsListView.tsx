@@ -79,11 +79,11 @@ export default function StopsListView({
                     <div className="text-white text-sm sm:text-base">
                       {stop.stop_name}
                       <span className="ml-2 text-xs text-gray-400">
-                        ({stop.stop_id.slice(-1)})
+                        ({stop.station ? 'N+S' : stop.stop_id.slice(-1)})
                       </span>
                     </div>
                     <div className="text-xs sm:text-sm text-gray-400">
-                      {isBus ? 'Bus stop' : `${stop.line} line`}{stop.direction && ` · ${stop.direction}`}
+                      {isBus ? 'Bus stop' : `${stop.line} line`}{stop.direction && ` · ${stop.direction}`}{stop.station && ' · Both directions'}
                       {stop.distance !== undefined && (
                         <span className={`ml-2 ${isBus ? 'text-blue-400' : 'text-purple-400'}`}>
                           {formatDistance(stop.distance)}
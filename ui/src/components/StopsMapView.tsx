@@ -79,7 +79,7 @@ interface StopsMapViewProps {
   showRouteLines: boolean;
 }
 
-// Grouped station with N and S stops
+// Grouped station with N and S stops, plus the parent station that covers both
 interface StationGroup {
   baseId: string;
   name: string;
@@ -87,6 +87,7 @@ interface StationGroup {
   lon: number;
   route: string;
   type: 'train' | 'bus';
+  station?: Stop;
   stops: {
     N?: Stop;
     S?: Stop;
@@ -268,8 +269,25 @@ function StationMarker({
           )}
 
           {/* Direction checkboxes for train stations */}
-          {group.type === 'train' && (group.stops.N || group.stops.S) && (
+          {group.type === 'train' && (group.station || group.stops.N || group.stops.S) && (
             <div className="mt-2 space-y-2">
+              {group.station && (
+                <label className="flex items-center gap-2 cursor-pointer hover:bg-gray-200 rounded px-1 py-1">
+                  <input
+                    type="checkbox"
+                    checked={selectedStopIds.includes(group.station.stop_id)}
+                    onChange={() => onToggleStop(group.station!.stop_id)}
+                    className="w-4 h-4 rounded border-gray-300 text-purple-600 focus:ring-purple-500"
+                  />
+                  <span
+                    className="w-6 h-6 rounded-full flex items-center justify-center text-white text-xs font-bold flex-shrink-0"
+                    style={{ backgroundColor: routeColor }}
+                  >
+                    {group.route}
+                  </span>
+                  <span className="text-sm text-gray-700">Both directions</span>
+                </label>
+              )}
               {group.stops.N && (
                 <label className="flex items-center gap-2 cursor-pointer hover:bg-gray-200 rounded px-1 py-1">
                   <input
@@ -382,9 +400,9 @@ export default function StopsMapView({
       }
 
       const direction = getDirectionFromStopId(stop.stop_id);
-      if (!direction) continue; // Skip parent stations without direction
+      if (!direction && !stop.station) continue; // Skip stops that are neither a platform nor a station
 
-      const baseId = getBaseStationId(stop.stop_id);
+      const baseId = stop.station ? stop.stop_id : getBaseStationId(stop.stop_id);
       const route = getRouteFromStopId(stop.stop_id);
 
       if (!groups[baseId]) {
@@ -399,7 +417,11 @@ export default function StopsMapView({
         };
       }
 
-      groups[baseId].stops[direction] = stop;
+      if (stop.station) {
+        groups[baseId].station = stop;
+      } else if (direction) {
+        groups[baseId].stops[direction] = stop;
+      }
     }
 
     return Object.values(groups);
@@ -464,6 +486,8 @@ export default function StopsMapView({
       return selectedStopIds.includes(group.baseId) ? 'full' : 'none';
     }
 
+    if (group.station && selectedStopIds.includes(group.station.stop_id)) return 'full';
+
     const nSelected = group.stops.N && selectedStopIds.includes(group.stops.N.stop_id);
     const sSelected = group.stops.S && selectedStopIds.includes(group.stops.S.stop_id);
     const hasN = !!group.stops.N;
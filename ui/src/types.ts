@@ -9,6 +9,7 @@ export interface Stop {
   direction: string;
   distance?: number;
   type: TransitType;
+  station?: boolean; // parent station: one selection covering both directions
 }
 
 export interface UserLocation {